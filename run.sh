@@ -1 +1 @@
-streamlit run src/streamlit_app.py --server.address 0.0.0.0 --server.port "$PORT" --server.headless true
\ No newline at end of file
+python src/analytics.py && streamlit run src/streamlit_app.py --server.address 0.0.0.0 --server.port "$PORT" --server.headless true
\ No newline at end of file
@@ -1,9 +1,19 @@
+"""
+Injects the analytics code and the meta tags into streamlit's index.html, which is shared by all the sessions.
+It's done once, by `python src/analytics.py` before the server starts (see run.sh), and checked once per process by the
+app for servers started otherwise. Reruns don't read or parse index.html, and sessions don't race writing it.
+"""
 import os
-
-import streamlit as st
 import shutil
+from dataclasses import dataclass
 from pathlib import Path
+from typing import List
+
+import streamlit as st
 from bs4 import BeautifulSoup
+from dotenv import load_dotenv
+
+__all__ = ['inject_analytics', 'ensure_analytics_injected']
 
 
 HOTJAR_TRACK_CODE = """
@@ -57,51 +67,77 @@ META_TAGS = """
 """
 
 
-def inject_hotjar():
+@dataclass(frozen=True)
+class Injection:
+    script: str
+    element_id: str
+    inject_head: bool = True
+
+
+def hotjar_injections() -> List[Injection]:
     hotjar_id = os.environ.get('HOTJAR_ID')
     if hotjar_id is None:
         print('No HOTJAR_ID found in environment variables')
-        return
+        return []
 
     HOTJAR_ELEMENT = "hotjar"
     script = HOTJAR_TRACK_CODE.replace('hotjar_id', hotjar_id).replace('element_id', HOTJAR_ELEMENT)
-    inject_script_to_streamlit(script, HOTJAR_ELEMENT)
+    return [Injection(script, HOTJAR_ELEMENT)]
 
 
-def inject_meta_tags():
+def meta_tags_injections() -> List[Injection]:
     TAGS_ID = "meta-title"
-    inject_script_to_streamlit(META_TAGS, TAGS_ID)
+    return [Injection(META_TAGS, TAGS_ID)]
 
 
-def inject_gtm():
+def gtm_injections() -> List[Injection]:
     gtm_id = os.environ.get('GTM_ID')
     if gtm_id is None:
         print('No GTM_ID found in environment variables')
-        return
+        return []
 
     GTM_HEAD_ELEMENT = "google_tag_manager_head"
     head_code = GTM_HEAD_CODE.replace('gtm_id', gtm_id).replace('element_id', GTM_HEAD_ELEMENT)
-    inject_script_to_streamlit(head_code, GTM_HEAD_ELEMENT)
 
     GTM_BODY_ELEMENT = "google_tag_manager_body"
     body_code = GTM_BODY_CODE.replace('gtm_id', gtm_id).replace('element_id', GTM_BODY_ELEMENT)
-    inject_script_to_streamlit(body_code, GTM_BODY_ELEMENT, inject_head=False)
+    return [Injection(head_code, GTM_HEAD_ELEMENT), Injection(body_code, GTM_BODY_ELEMENT, inject_head=False)]
 
 
-def inject_script_to_streamlit(script, element_id, inject_head=True):
-    # Insert the script in the head tag of the static template inside your virtual
+def inject_scripts_to_streamlit(injections: List[Injection]):
+    # Insert the scripts in the head (or body) tag of the static template inside your virtual env
     index_path = Path(st.__file__).parent / "static" / "index.html"
     soup = BeautifulSoup(index_path.read_text(), features="html.parser")
-    if not soup.find(id=element_id):  # if cannot find tag
-        bck_index = index_path.with_suffix('.bck')
-        if bck_index.exists():
-            shutil.copy(bck_index, index_path)  # recover from backup
-        else:
-            shutil.copy(index_path, bck_index)  # keep a backup
-        html = str(soup)
-        if inject_head:
-            new_html = html.replace('<head>', '<head>\n' + script)
+    missing = [injection for injection in injections if not soup.find(id=injection.element_id)]
+    if not missing:
+        return
+    bck_index = index_path.with_suffix('.bck')
+    if not bck_index.exists():
+        shutil.copy(index_path, bck_index)  # keep a backup
+    html = str(soup)
+    for injection in missing:
+        if injection.inject_head:
+            html = html.replace('<head>', '<head>\n' + injection.script)
         else:
-            new_html = html.replace('<body>', '<body>\n' + script)
-        index_path.write_text(new_html)
-        print(f'Injected {element_id}')
+            html = html.replace('<body>', '<body>\n' + injection.script)
+        print(f'Injected {injection.element_id}')
+    # Replaced at once, so the server never serves a partly written page
+    tmp_path = index_path.with_suffix('.tmp')
+    tmp_path.write_text(html)
+    os.replace(tmp_path, index_path)
+
+
+def inject_analytics():
+    """Inject the analytics code and meta tags which are missing from the index page. Does nothing if all exist."""
+    load_dotenv()
+    inject_scripts_to_streamlit(hotjar_injections() + meta_tags_injections() + gtm_injections())
+
+
+@st.cache_resource(show_spinner=False)
+def ensure_analytics_injected() -> bool:
+    inject_analytics()
+    return True
+
+
+if __name__ == '__main__':
+    inject_analytics()
@@ -0,0 +1,108 @@
+"""
+Runs a grid of checks, datasets and corruption parameters in a pool of worker processes, without streamlit, and
+writes every result (html, value as JSON and snippet) to an output directory.
+Runs whose results were already written are skipped, so an interrupted batch continues where it stopped.
+Usage: python src/batch_run.py output_dir [--grid grid.json] [--workers 4]
+
+The grid file is a list of entries, each with a check name (as shown in the app), optional dataset names (default all
+the datasets of the check) and lists of values for any of the check's parameters, including the seed. Every
+combination of the values is run, with the check's default parameters for the ones not given, e.g.
+[{"check": "Data Duplicates (integrity)", "datasets": ["iris (classification)"], "params": {"percent": [10, 50]}}]
+Without a grid file every check runs on every dataset with its default parameters.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+from concurrent.futures import as_completed
+from pathlib import Path
+
+from checks import get_check_datasets, get_check_options_by_name, load_run_module
+from constants import DEFAULT_SEED
+from datasets import build_dataset_options
+from encoder import AppEncoder
+from result_cache import build_cache_key
+from worker_pool import create_pool, run_check
+
+# Written last, it marks the run's results as complete
+PARAMS_FILE = 'params.json'
+
+
+def slugify(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def build_runs(grid: list):
+    """Expand the grid to a list of (check name, dataset name, params) to run."""
+    datasets = build_dataset_options()
+    checks = get_check_options_by_name()
+    runs = []
+    for entry in grid:
+        if entry['check'] not in checks:
+            raise ValueError(f'Unknown check "{entry["check"]}", available checks are: {", ".join(checks)}')
+        run_module = load_run_module(checks[entry['check']])
+        check_datasets = get_check_datasets(entry['check'], datasets)
+        for dataset_name in entry.get('datasets') or check_datasets:
+            if dataset_name not in check_datasets:
+                raise ValueError(f'Dataset "{dataset_name}" is not available for check "{entry["check"]}"')
+            default_params = dict(run_module.get_default_params(check_datasets[dataset_name]), seed=DEFAULT_SEED)
+            grid_params = entry.get('params', {})
+            for values in itertools.product(*grid_params.values()):
+                params = dict(default_params, **dict(zip(grid_params, values)))
+                runs.append((entry['check'], dataset_name, params))
+    return runs
+
+
+def get_run_dir(output_dir: Path, check_name: str, dataset_name: str, params: dict) -> Path:
+    params_hash = hashlib.sha1(build_cache_key(check_name, dataset_name, params).encode()).hexdigest()[:16]
+    return output_dir / slugify(check_name) / slugify(dataset_name) / params_hash
+
+
+def write_result(run_dir: Path, check_name: str, dataset_name: str, params: dict, html: str, value, snippets: dict):
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / 'result.html').write_text(html, encoding='utf-8')
+    try:
+        value_json = json.dumps(value, indent=4, cls=AppEncoder)
+    except (TypeError, ValueError):
+        # Values JSON doesn't support (e.g. dict with tuple keys) are written as printed
+        value_json = json.dumps(str(value))
+    (run_dir / 'value.json').write_text(value_json)
+    for data_format, snippet in snippets.items():
+        (run_dir / f'snippet_{slugify(data_format)}.py').write_text(snippet)
+    (run_dir / PARAMS_FILE).write_text(json.dumps({'check': check_name, 'dataset': dataset_name, 'params': params},
+                                                  indent=4, cls=AppEncoder))
+
+
+def run_batch(output_dir: Path, grid: list, workers: int):
+    runs = build_runs(grid)
+    pending = [run for run in runs if not (get_run_dir(output_dir, *run) / PARAMS_FILE).exists()]
+    print(f'{len(runs)} runs, {len(runs) - len(pending)} already done')
+    checks = get_check_options_by_name()
+    failed = 0
+    with create_pool(workers) as pool:
+        futures = {pool.submit(run_check, checks[check_name]['module_path'], dataset_name, params):
+                   (check_name, dataset_name, params) for check_name, dataset_name, params in pending}
+        for index, future in enumerate(as_completed(futures), start=1):
+            check_name, dataset_name, params = futures[future]
+            run_dir = get_run_dir(output_dir, check_name, dataset_name, params)
+            try:
+                write_result(run_dir, check_name, dataset_name, params, *future.result())
+                print(f'[{index}/{len(pending)}] {check_name} on {dataset_name}: {run_dir}')
+            except Exception as e:
+                failed += 1
+                print(f'[{index}/{len(pending)}] {check_name} on {dataset_name} failed: {e!r}')
+    print(f'Done, {failed} runs failed')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output_dir', help='Directory to write the results to')
+    parser.add_argument('--grid', help='JSON file of the grid to run (default all checks with default parameters)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    args = parser.parse_args()
+
+    grid = json.loads(Path(args.grid).read_text()) if args.grid else \
+        [{'check': check_name} for check_name in get_check_options_by_name()]
+    run_batch(Path(args.output_dir), grid, args.workers)
@@ -0,0 +1,159 @@
+"""
+Benchmarks every check with its default parameters on every dataset, across a range of sample sizes, without streamlit.
+Each run is split into stages: the corruption, the check itself and the html rendering. Every stage reports its wall
+time, peak RSS and peak traced allocations, so the JSON reports of two versions can be compared.
+Usage: python src/benchmark.py [--checks ...] [--datasets ...] [--sample-sizes 1000 10000 100000] [--json report.json]
+"""
+import argparse
+import gc
+import json
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import replace
+from pathlib import Path
+
+from checks import get_check_datasets, get_check_options_by_name, load_run_module
+from constants import DEFAULT_SEED
+from datasets import DatasetOption, SAMPLE_RANDOM_STATE, build_dataset_options
+from worker_pool import render_html
+
+STAGES = ['corruption', 'check', 'html']
+
+
+def resample(dataset, sample_size: int):
+    # Sampled with replacement, so datasets smaller than the sample size are scaled up
+    data = dataset.data.sample(sample_size, replace=True, random_state=SAMPLE_RANDOM_STATE)
+    return dataset.copy(data.reset_index(drop=True))
+
+
+def resampled_option(option: DatasetOption, sample_size: int) -> DatasetOption:
+    train, test, model = option.load()
+    resampled = (resample(train, sample_size), resample(test, sample_size), model)
+    return replace(option, snapshot_name=None, loader=lambda _: resampled)
+
+
+def reset_peak_rss() -> bool:
+    """Reset the peak RSS of the process, supported only by linux."""
+    try:
+        Path('/proc/self/clear_refs').write_text('5')
+        return True
+    except OSError:
+        return False
+
+
+def get_peak_rss() -> int:
+    status = Path('/proc/self/status')
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+    # Can't be reset, so it's the peak of the whole process so far
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def corrupted_datasets(run_module, datasets):
+    """Make run() use the already corrupted datasets, instead of applying the corruption again."""
+    corrupt = run_module.corrupt
+    run_module.corrupt = lambda option, params: datasets
+    try:
+        yield
+    finally:
+        run_module.corrupt = corrupt
+
+
+def run_stages(run_module, option: DatasetOption, params: dict, stage_hook):
+    """Run all the stages, calling stage_hook(stage_name, func) to run each one."""
+    datasets = stage_hook('corruption', lambda: run_module.corrupt(option, params))
+    with corrupted_datasets(run_module, datasets):
+        check_result, _ = stage_hook('check', lambda: run_module.run(option, params))
+    stage_hook('html', lambda: render_html(check_result))
+
+
+def measure(run_module, option: DatasetOption, params: dict) -> dict:
+    stages = {}
+
+    # Time and RSS are measured without tracemalloc, which slows down allocations
+    def timed(stage, func):
+        gc.collect()
+        reset_peak_rss()
+        start = time.perf_counter()
+        result = func()
+        stages[stage] = {'wall_seconds': time.perf_counter() - start, 'peak_rss_bytes': get_peak_rss()}
+        return result
+
+    def traced(stage, func):
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = func()
+            stages[stage]['alloc_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return result
+
+    run_stages(run_module, option, params, timed)
+    run_stages(run_module, option, params, traced)
+    return stages
+
+
+def run_benchmark(check_names, dataset_names, sample_sizes):
+    datasets = build_dataset_options()
+    checks = get_check_options_by_name()
+    results = []
+    for check_name in check_names or checks:
+        run_module = load_run_module(checks[check_name])
+        is_warm = False
+        for dataset_name, option in get_check_datasets(check_name, datasets).items():
+            if dataset_names and dataset_name not in dataset_names:
+                continue
+            for sample_size in sample_sizes:
+                result = {'check': check_name, 'dataset': dataset_name, 'sample_size': sample_size}
+                try:
+                    sized_option = resampled_option(option, sample_size)
+                    params = dict(run_module.get_default_params(sized_option), seed=DEFAULT_SEED)
+                    if not is_warm:
+                        # The first run of a check also pays for its imports, so it isn't measured
+                        run_stages(run_module, sized_option, params, lambda stage, func: func())
+                        is_warm = True
+                    result['stages'] = measure(run_module, sized_option, params)
+                except Exception as e:
+                    result['error'] = repr(e)
+                print_result(result)
+                results.append(result)
+    return results
+
+
+def print_result(result: dict):
+    name = f'{result["check"]} / {result["dataset"]} / {result["sample_size"]}'
+    if 'error' in result:
+        print(f'{name}: failed with {result["error"]}')
+        return
+    stages = ', '.join(f'{stage} {result["stages"][stage]["wall_seconds"] * 1000:.0f} ms'
+                       f' ({result["stages"][stage]["alloc_peak_bytes"] / 1024 ** 2:.1f} MB allocated)'
+                       for stage in STAGES)
+    print(f'{name}: {stages}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--checks', nargs='+', help='Names of the checks to run, as shown in the app (default all)')
+    parser.add_argument('--datasets', nargs='+', help='Names of the datasets to run on (default all)')
+    parser.add_argument('--sample-sizes', nargs='+', type=int, default=[1_000, 10_000, 100_000],
+                        help='Number of rows of both the train and the test datasets')
+    parser.add_argument('--json', help='Also write the report as JSON to this path')
+    args = parser.parse_args()
+
+    import deepchecks
+    report = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'deepchecks': deepchecks.__version__,
+        'results': run_benchmark(args.checks, args.datasets, args.sample_sizes),
+    }
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=4))
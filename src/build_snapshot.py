@@ -0,0 +1,25 @@
+"""
+Build step which writes all the demo datasets (train/test samples, fitted models and metadata) and the checks'
+documentation to a local snapshot directory, so the app loads them from disk at startup instead of downloading or
+rendering them.
+Usage: python src/build_snapshot.py [snapshot_dir]
+"""
+import sys
+from pathlib import Path
+
+from check_docs import save_check_docs
+from checks import get_checks_options
+from constants import SNAPSHOT_DIR
+from datasets import build_dataset_options, save_snapshot
+
+
+def build_snapshot(snapshot_dir: Path):
+    for name, option in build_dataset_options().items():
+        save_snapshot(option, snapshot_dir / option.snapshot_name)
+        print(f'Saved {name} to {snapshot_dir / option.snapshot_name}')
+    save_check_docs([check_opt['class_path'] for check_opt in get_checks_options()], snapshot_dir)
+    print(f'Saved the checks documentation to {snapshot_dir}')
+
+
+if __name__ == '__main__':
+    build_snapshot(Path(sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_DIR))
@@ -0,0 +1,56 @@
+"""
+The documentation of the checks, rendered from their numpy docstrings to markdown. Rendering a docstring imports its
+check and parses it, and its markdown changes only with the deepchecks version, so every check's docs are rendered once
+and kept for the whole process, keyed by the check class and the deepchecks version.
+The docs are also written to the snapshot by build_snapshot.py, so the server only reads them.
+"""
+import threading
+from functools import lru_cache
+from importlib.metadata import version
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+from constants import SNAPSHOT_DIR
+
+__all__ = ['get_check_docs', 'save_check_docs']
+
+DOCS_SNAPSHOT_DIR = 'docs'
+
+# Keyed by (class path, deepchecks version)
+_docs: Dict[Tuple[str, str], str] = {}
+_docs_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def deepchecks_version() -> str:
+    # Read from the package metadata, without importing deepchecks
+    return version('deepchecks')
+
+
+def get_docs_path(snapshot_dir: Path, class_path: str) -> Path:
+    return snapshot_dir / DOCS_SNAPSHOT_DIR / deepchecks_version() / f'{class_path}.md'
+
+
+def render_check_docs(class_path: str) -> str:
+    import npdoc_to_md
+    return npdoc_to_md.render_obj_docstring(class_path, alias=class_path.rsplit('.', 1)[1])
+
+
+def get_check_docs(class_path: str) -> str:
+    """The markdown of the check's docstring, read from the snapshot or rendered on the first call."""
+    key = (class_path, deepchecks_version())
+    with _docs_lock:
+        if key in _docs:
+            return _docs[key]
+    docs_path = get_docs_path(Path(SNAPSHOT_DIR), class_path)
+    # Rendered outside the lock, at worst concurrent first calls render the same docs twice
+    docs_md = docs_path.read_text() if docs_path.exists() else render_check_docs(class_path)
+    with _docs_lock:
+        return _docs.setdefault(key, docs_md)
+
+
+def save_check_docs(class_paths: Iterable[str], snapshot_dir: Path):
+    for class_path in class_paths:
+        docs_path = get_docs_path(snapshot_dir, class_path)
+        docs_path.parent.mkdir(parents=True, exist_ok=True)
+        docs_path.write_text(render_check_docs(class_path))
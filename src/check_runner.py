@@ -0,0 +1,146 @@
+"""
+Runs the checks in background threads, so a slow check doesn't freeze the page and widget changes made while it
+runs are not queued one after the other.
+Every session has a single current run. A newer run supersedes it: the superseded run is cancelled if it didn't start
+yet, otherwise it's left to finish in the background and its result is only cached, not shown. Until the new run is
+done the page keeps showing the last completed result of the same check.
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import streamlit as st
+
+from constants import CHECK_RUN_WORKERS, CHECK_RUN_PROCESSES, RUN_STATE_ID
+from corrupted_data import DataRecipe
+from datasets import DatasetOption
+from metrics import stage_labels, time_stage
+from result_cache import CachedResult, result_cache
+from shared_assets import share_inline_scripts
+from worker_pool import render_html, run_in_worker
+
+__all__ = ['compute_result', 'get_check_result', 'wait_and_rerun', 'run_shared']
+
+RUN_STATUS_INTERVAL_SECONDS = 0.5
+
+# With worker processes, these threads only wait for the processes
+_executor = ThreadPoolExecutor(max_workers=max(CHECK_RUN_WORKERS, CHECK_RUN_PROCESSES),
+                               thread_name_prefix='check-run')
+# Runs in progress, shared between the sessions so identical runs are done only once
+_runs: Dict[str, Future] = {}
+_runs_lock = threading.Lock()
+
+
+@dataclass
+class SessionRun:
+    cache_key: Optional[str] = None
+    future: Optional[Future] = None
+    last_check_name: Optional[str] = None
+    last_dataset_name: Optional[str] = None
+    last_result: Optional[CachedResult] = None
+
+
+def compute_result(check_name: str, run_module, dataset_name: str, dataset: DatasetOption,
+                   params: dict) -> CachedResult:
+    """Run the check and render its result. Doesn't use streamlit, so can run outside the script thread."""
+    with stage_labels(check=check_name, dataset=dataset_name), time_stage('total'):
+        if CHECK_RUN_PROCESSES > 0:
+            html, value, snippets = run_in_worker(run_module.__name__, dataset_name, params)
+        else:
+            check_result, snippets = run_module.run(dataset, params)
+            html, value = render_html(check_result), check_result.value
+    data_recipe = DataRecipe(check_name=check_name, run_module=run_module.__name__, dataset_name=dataset_name,
+                             params=params)
+    return CachedResult(html=share_inline_scripts(html), value=value, snippets=snippets, data_recipe=data_recipe)
+
+
+def _run_and_cache(cache_key: str, run: Callable[[], CachedResult]) -> CachedResult:
+    result = run()
+    result_cache.put(cache_key, result)
+    return result
+
+
+def _forget_run(cache_key: str, future: Future):
+    with _runs_lock:
+        if _runs.get(cache_key) is future:
+            del _runs[cache_key]
+
+
+def submit_run(cache_key: str, run: Callable[[], CachedResult]) -> Future:
+    """Start the run in the background, unless the same run is already in progress."""
+    with _runs_lock:
+        future = _runs.get(cache_key)
+        is_new = future is None or future.cancelled()
+        if is_new:
+            future = _executor.submit(_run_and_cache, cache_key, run)
+            _runs[cache_key] = future
+    if is_new:
+        # Added outside the lock, as the callback is called immediately if the run is already done
+        future.add_done_callback(lambda f: _forget_run(cache_key, f))
+    return future
+
+
+def run_shared(cache_key: str, run: Callable[[], CachedResult]) -> Optional[CachedResult]:
+    """Run in the calling thread, letting sessions which request the same run meanwhile wait for it.
+
+    Returns None if a session cancelled the run before it started.
+    """
+    with _runs_lock:
+        future = _runs.get(cache_key)
+        is_new = future is None or future.cancelled()
+        if is_new:
+            future = Future()
+            _runs[cache_key] = future
+    if not is_new:
+        return future.result()
+    try:
+        if not future.set_running_or_notify_cancel():
+            return None
+        try:
+            result = _run_and_cache(cache_key, run)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+    finally:
+        _forget_run(cache_key, future)
+
+
+def get_check_result(check_name: str, dataset_name: str, cache_key: str,
+                     run: Callable[[], CachedResult]) -> Tuple[Optional[CachedResult], Optional[Future]]:
+    """Return the result to show for the session, and the run in progress if the result isn't the requested one."""
+    session_run: SessionRun = st.session_state.setdefault(RUN_STATE_ID, SessionRun())
+    result = result_cache.get(cache_key)
+    if result is None:
+        # A run cancelled by another session is started again
+        if session_run.cache_key != cache_key or session_run.future.cancelled():
+            if session_run.future is not None:
+                session_run.future.cancel()
+            session_run.cache_key = cache_key
+            session_run.future = submit_run(cache_key, run)
+        # The result is taken from the run itself when it's done, in case the cache didn't keep it
+        if not session_run.future.done():
+            # The last result is shown meanwhile only if it's of the same check on the same dataset
+            is_same_run = (session_run.last_check_name, session_run.last_dataset_name) == (check_name, dataset_name)
+            last_result = session_run.last_result if is_same_run else None
+            return last_result, session_run.future
+        result = session_run.future.result()
+    session_run.last_check_name = check_name
+    session_run.last_dataset_name = dataset_name
+    session_run.last_result = result
+    return result, None
+
+
+def wait_and_rerun(future: Future, status_placeholder):
+    """Wait for the run to finish and rerun the script to show its result.
+
+    The status is updated while waiting, which lets streamlit interrupt the wait when a widget is changed.
+    """
+    start = time.monotonic()
+    while not future.done():
+        status_placeholder.info(f'Running check... {time.monotonic() - start:.0f}s')
+        wait([future], timeout=RUN_STATUS_INTERVAL_SECONDS)
+    st.experimental_rerun()
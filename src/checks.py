@@ -1,53 +1,81 @@
-import io
+import importlib
 import json
-from typing import Sequence, TypedDict, Callable, Any
+import re
+from functools import partial
+from typing import Dict, Sequence, TypedDict
 
-import npdoc_to_md
 import streamlit as st
-from deepchecks.tabular.checks import SimpleModelComparison, FeatureLabelCorrelation
-from deepchecks.tabular.checks import TrainTestFeatureDrift, TrainTestLabelDrift
-from deepchecks.tabular.checks import StringMismatch, DataDuplicates
-from deepchecks.tabular.checks import SegmentPerformance
 import streamlit.components.v1 as components
 
-import run_train_test_feature_drift, run_train_test_label_drift, run_string_mismatch, run_data_duplicates, \
-    run_segment_performance, run_simple_model_comparison, run_feature_label_correlation
-from constants import NO_CHECK_SELECTED, CHECK_STATE_ID, DATA_STATE_ID
-from datasets import get_dataset_options
+from constants import NO_CHECK_SELECTED, CHECK_STATE_ID, SEED_STATE_ID, DATA_FORMAT_STATE_ID, \
+    BATCH_MODE_STATE_ID
+from datasets import DatasetOption, get_dataset_options
+from downloads import DATA_FORMATS
+from check_docs import get_check_docs
+from check_runner import compute_result, get_check_result, run_shared, wait_and_rerun
+from corrupted_data import describe_corrupted_data, get_corrupted_data
+from result_cache import CachedResult, build_cache_key, result_cache
 
 
 __all__ = ['show_checks_page']
 
 from encoder import AppEncoder
+from metrics import stage_labels, time_stage
+from profiling import is_profiling, tag_profile
 from streamlit_persist import persist
-from utils import add_download_button
+from utils import add_download_button, put_data_on_state
 
 
 class CheckOption(TypedDict):
+    """Check shown in the demo. The check class and its run module are imported only when the check is selected."""
     type: str
-    class_var: Any
-    run_function: Callable
+    # Dotted path of the deepchecks check class
+    class_path: str
+    # Name of the module which implements get_params, get_default_params and run for the check
+    module_path: str
 
 
 def get_checks_options():
     return [
-        CheckOption(type='distribution', class_var=TrainTestFeatureDrift,
-                    run_function=run_train_test_feature_drift.run),
-        CheckOption(type='distribution', class_var=TrainTestLabelDrift,
-                    run_function=run_train_test_label_drift.run),
-        CheckOption(type='integrity', class_var=StringMismatch,
-                    run_function=run_string_mismatch.run),
-        CheckOption(type='integrity', class_var=DataDuplicates,
-                    run_function=run_data_duplicates.run),
-        CheckOption(type='performance', class_var=SegmentPerformance,
-                    run_function=run_segment_performance.run),
-        CheckOption(type='performance', class_var=SimpleModelComparison,
-                    run_function=run_simple_model_comparison.run),
-        CheckOption(type='methodology', class_var=FeatureLabelCorrelation,
-                    run_function=run_feature_label_correlation.run),
+        CheckOption(type='distribution', class_path='deepchecks.tabular.checks.TrainTestFeatureDrift',
+                    module_path='run_train_test_feature_drift'),
+        CheckOption(type='distribution', class_path='deepchecks.tabular.checks.TrainTestLabelDrift',
+                    module_path='run_train_test_label_drift'),
+        CheckOption(type='integrity', class_path='deepchecks.tabular.checks.StringMismatch',
+                    module_path='run_string_mismatch'),
+        CheckOption(type='integrity', class_path='deepchecks.tabular.checks.DataDuplicates',
+                    module_path='run_data_duplicates'),
+        CheckOption(type='performance', class_path='deepchecks.tabular.checks.SegmentPerformance',
+                    module_path='run_segment_performance'),
+        CheckOption(type='performance', class_path='deepchecks.tabular.checks.SimpleModelComparison',
+                    module_path='run_simple_model_comparison'),
+        CheckOption(type='methodology', class_path='deepchecks.tabular.checks.FeatureLabelCorrelation',
+                    module_path='run_feature_label_correlation'),
     ]
 
 
+def get_check_name(check_opt: CheckOption) -> str:
+    # Same as deepchecks' BaseCheck.name(), without importing the check class
+    class_name = check_opt['class_path'].rsplit('.', 1)[1]
+    return ' '.join(re.findall('[A-Z][^A-Z]*', class_name))
+
+
+def get_check_options_by_name() -> Dict[str, CheckOption]:
+    # Translate check classes to the names shown in the check selector
+    return {f'{get_check_name(check_opt)} ({check_opt["type"]})': check_opt for check_opt in get_checks_options()}
+
+
+def get_check_datasets(check_name: str, datasets: Dict[str, DatasetOption]) -> Dict[str, DatasetOption]:
+    # For check "string mismatch" we need only datasets that contains categorical features
+    if 'String Mismatch' in check_name:
+        return {name: dataset for name, dataset in datasets.items() if dataset.contain_categorical_columns}
+    return datasets
+
+
+def load_run_module(check_opt: CheckOption):
+    return importlib.import_module(check_opt['module_path'])
+
+
 def show_checks_page():
     TEMPLATE_WRAPPER = """
     <div style="height:{height}px;overflow-y:auto;position:relative;">
@@ -56,10 +84,7 @@ def show_checks_page():
     """
 
     datasets = get_dataset_options()
-    checks: list = get_checks_options()
-    # Translate check classes to names
-    name_to_check_opt = {f'{check_opt["class_var"].name()} ({check_opt["type"]})': check_opt
-                         for index, check_opt in enumerate(checks)}
+    name_to_check_opt = get_check_options_by_name()
     # Add default option of no check selected
     check_options_names = [NO_CHECK_SELECTED] + list(name_to_check_opt.keys())
 
@@ -80,53 +105,47 @@ def show_checks_page():
     result_col, snippet_col = st.columns([2, 1])
 
     # select a dataset
-    # For check "string mismatch" we need only datasets that contains categorical features
-    if StringMismatch.name() in selected_check:
-        datasets = {name: dataset for name, dataset in datasets.items() if dataset.contain_categorical_columns}
+    datasets = get_check_datasets(selected_check, datasets)
     dataset_name = st.sidebar.selectbox('Select a dataset', datasets.keys())
     dataset = datasets[dataset_name]
 
     st.sidebar.subheader('Check\'s Parameters')
-    check_params_col = st.sidebar.container()
-    manipulate_col = st.sidebar.container()
-    # Run the check
-    with st.spinner('Running check'):
-        check_opt = name_to_check_opt[selected_check]
-        check_run = check_opt['run_function']
-        check_result, snippet = check_run(dataset, check_params_col, manipulate_col)
-        string_io = io.StringIO()
-        check_result.save_as_html(string_io)
-        result_html = string_io.getvalue()
-        result_value = check_result.value
+    # In batch mode the widgets are in a form, so their changes are applied together only when it's submitted
+    batch_mode = st.session_state[BATCH_MODE_STATE_ID]
+    params_container = st.sidebar.form('check_params') if batch_mode else st.sidebar
+    check_params_col = params_container.container()
+    manipulate_col = params_container.container()
+    check_opt = name_to_check_opt[selected_check]
+    run_module = load_run_module(check_opt)
+    # The dataset is loaded on its first access, which is usually here
+    with stage_labels(check=selected_check, dataset=dataset_name):
+        params = run_module.get_params(dataset, check_params_col, manipulate_col)
+    # The corruptions are generated from this seed, so the same parameters always give the same data
+    params['seed'] = params_container.number_input('Random seed', min_value=0, step=1, key=persist(SEED_STATE_ID))
+    if batch_mode:
+        params_container.form_submit_button('Run check')
+    # Run the check in the background, unless the exact same run is already cached
+    cache_key = build_cache_key(selected_check, dataset_name, params)
+    run = partial(compute_result, selected_check, run_module, dataset_name, dataset, params)
+    tag_profile(check=selected_check, dataset=dataset_name, params=params)
+    # A profiled rerun runs the check in the script thread, so the profile includes it
+    if is_profiling() and cache_key not in result_cache:
+        run_shared(cache_key, run)
+    cached_result, pending_run = get_check_result(selected_check, dataset_name, cache_key, run)
 
     with snippet_col:
         st.subheader('Run this example in your own environment')
-        st.markdown('In order to run the snippet, download the data and change the paths accordingly. '
-                    'The data you download will correspond to the latest corruptions applied.')
-        add_download_button()
-        st.code(snippet, language='python')
-        if result_value is not None:
-            with st.expander('print(result.value)'):
-                # If the result value is simple type (e.g. int, float, str) it can't be displayed as json
-                if isinstance(result_value, (dict, Sequence)):
-                    result_value = json.dumps(result_value, indent=4, sort_keys=False, cls=AppEncoder)
-                    st.json(result_value)
-                else:
-                    st.code(str(result_value), language='python')
-        data_state = st.session_state[DATA_STATE_ID]
-        with st.expander(f'Dataset "{dataset_name}" Head', expanded=True):
-            st.markdown(f'Showing the first 5 rows of the {data_state["dataset_type"]}')
-            st.dataframe(data_state['data'][data_state['corrupted_dataset_index']].head(5))
+        if cached_result is not None:
+            show_result_details(cached_result)
         with st.expander(f'Documentation of the Check (docstring)'):
-            check_class = check_opt['class_var']
-            docs_md = npdoc_to_md.render_md_from_obj_docstring(check_class, check_class.__name__)
-            st.markdown(docs_md, unsafe_allow_html=True)
+            st.markdown(get_check_docs(check_opt['class_path']), unsafe_allow_html=True)
 
     result_col.subheader(selected_check)
+    run_status = result_col.empty()
 
-    if result_html:
+    if cached_result is not None and cached_result['html']:
         height_px = 1000
-        html = TEMPLATE_WRAPPER.format(body=result_html, height=height_px)
+        html = TEMPLATE_WRAPPER.format(body=cached_result['html'], height=height_px)
         with result_col:
             components.html(html, height=height_px)
 
@@ -139,3 +158,33 @@ def show_checks_page():
     For more info, check out our [docs](https://docs.deepchecks.com/stable?utm_campaign=docs_button&utm_medium=referral&utm_source=checks-demo.deepchecks.com)
     """
     st.sidebar.markdown(footnote, unsafe_allow_html=True)
+
+    # Shown last, so the rest of the page is already drawn while waiting
+    if pending_run is not None:
+        wait_and_rerun(pending_run, run_status)
+
+
+def show_result_details(cached_result: CachedResult):
+    """Show the snippet, the data and the value of the check result."""
+    data_recipe = cached_result['data_recipe']
+    put_data_on_state(data_recipe)
+    result_value = cached_result['value']
+    st.markdown('In order to run the snippet, download the data and change the paths accordingly. '
+                'The data you download will correspond to the latest corruptions applied.')
+    data_format = st.selectbox('Data format', list(DATA_FORMATS), format_func=lambda f: DATA_FORMATS[f].label,
+                               key=persist(DATA_FORMAT_STATE_ID))
+    add_download_button(data_format)
+    st.code(cached_result['snippets'][data_format], language='python')
+    if result_value is not None:
+        with st.expander('print(result.value)'):
+            # If the result value is simple type (e.g. int, float, str) it can't be displayed as json
+            if isinstance(result_value, (dict, Sequence)):
+                with time_stage('value_json', check=data_recipe['check_name'], dataset=data_recipe['dataset_name']):
+                    result_value = json.dumps(result_value, indent=4, sort_keys=False, cls=AppEncoder)
+                st.json(result_value)
+            else:
+                st.code(str(result_value), language='python')
+    data_frames = get_corrupted_data(data_recipe)
+    with st.expander(f'Dataset "{data_recipe["dataset_name"]}" Head', expanded=True):
+        st.markdown(f'Showing the first 5 rows of the {describe_corrupted_data(data_frames)}')
+        st.dataframe(data_frames[-1].head(5))
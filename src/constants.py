@@ -1,3 +1,5 @@
+import os
+
 NO_CHECK_SELECTED = 'No check selected'
 NO_SUITE_SELECTED = 'No suite selected'
 CHECK_STATE_ID = 'check_state'
@@ -5,3 +7,45 @@ SUITE_STATE_ID = 'suite_state'
 CHECK_QUERY_PARAM = 'check'
 SUITE_QUERY_PARAM = 'suite'
 DATA_STATE_ID = 'data_state'
+DOWNLOAD_STATE_ID = 'download_state'
+DATA_FORMAT_STATE_ID = 'data_format_state'
+SEED_STATE_ID = 'seed_state'
+RUN_STATE_ID = 'run_state'
+SEED_QUERY_PARAM = 'seed'
+DEFAULT_SEED = 0
+BATCH_MODE_STATE_ID = 'batch_mode_state'
+BATCH_MODE_QUERY_PARAM = 'batch'
+
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 256))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 512 * 1024 ** 2))
+# The corrupted data of the recently shown or downloaded results, shared by all sessions
+CORRUPTED_DATA_CACHE_MAX_ENTRIES = int(os.environ.get('CORRUPTED_DATA_CACHE_MAX_ENTRIES', 16))
+CORRUPTED_DATA_CACHE_MAX_BYTES = int(os.environ.get('CORRUPTED_DATA_CACHE_MAX_BYTES', 256 * 1024 ** 2))
+# Number of checks running in the background at the same time, shared by all sessions
+CHECK_RUN_WORKERS = int(os.environ.get('CHECK_RUN_WORKERS', 2))
+# Number of worker processes running the checks, 0 runs them in the server process
+CHECK_RUN_PROCESSES = int(os.environ.get('CHECK_RUN_PROCESSES', 0))
+# Number of threads precomputing the default results of all checks when the server starts, 0 disables it
+WARMUP_WORKERS = int(os.environ.get('WARMUP_WORKERS', 1))
+# Approximate memory budget of the state of all the sessions, over it the oldest sessions drop their check results
+SESSION_STATE_MAX_BYTES = int(os.environ.get('SESSION_STATE_MAX_BYTES', 256 * 1024 ** 2))
+# Sessions idle for longer drop their check results anyway
+SESSION_IDLE_SECONDS = int(os.environ.get('SESSION_IDLE_SECONDS', 10 * 60))
+# Interval of the sessions memory sweeps, 0 disables them
+SESSION_SWEEP_SECONDS = int(os.environ.get('SESSION_SWEEP_SECONDS', 60))
+# In batch mode the check's parameters are applied together with a run button, instead of on every widget change
+BATCH_MODE = os.environ.get('BATCH_MODE', '').lower() in ('1', 'true')
+
+# Reruns are profiled when PROFILE_RERUNS is set, or when their URL has profile=<PROFILE_TOKEN>. See profiling.py
+PROFILE_QUERY_PARAM = 'profile'
+PROFILE_RERUNS = os.environ.get('PROFILE_RERUNS', '').lower() in ('1', 'true')
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(__file__), '..', 'profiles'))
+PROFILE_SAMPLE_SECONDS = float(os.environ.get('PROFILE_SAMPLE_SECONDS', 0.005))
+
+# Rows sampled from each of the train and test datasets, empty for all the rows. Overridden per dataset by
+# DATASETS_SAMPLE_SIZE_<NAME>, e.g. DATASETS_SAMPLE_SIZE_AVOCADO=100000
+DATASETS_SAMPLE_SIZE = os.environ.get('DATASETS_SAMPLE_SIZE')
+
+# Local snapshot of the datasets and fitted models, written by build_snapshot.py
+SNAPSHOT_DIR = os.environ.get('DATASETS_SNAPSHOT_DIR', os.path.join(os.path.dirname(__file__), '..', 'snapshot'))
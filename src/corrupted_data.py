@@ -0,0 +1,64 @@
+"""
+Sessions keep only the recipe of their corrupted data: the check's run module, the dataset and the corruption
+parameters (including the seed). The corruptions are deterministic, so the data is rebuilt from the shared base
+datasets when it's shown or downloaded, and the recently used data is kept in a small cache shared by all sessions.
+"""
+import importlib
+from typing import List, TypedDict
+
+import numpy as np
+import pandas as pd
+
+from constants import CORRUPTED_DATA_CACHE_MAX_BYTES, CORRUPTED_DATA_CACHE_MAX_ENTRIES
+from datasets import get_dataset_options
+from metrics import stage_labels
+from result_cache import ResultCache, build_cache_key
+
+__all__ = ['DataRecipe', 'get_corrupted_data', 'describe_corrupted_data']
+
+
+class DataRecipe(TypedDict):
+    check_name: str
+    # Name of the module which implements corrupt for the check
+    run_module: str
+    dataset_name: str
+    params: dict
+
+
+def _column_values(column: pd.Series) -> np.ndarray:
+    # A view of the column's data (the codes of a categorical), without copying it
+    return column.cat.codes.to_numpy() if isinstance(column.dtype, pd.CategoricalDtype) else column.to_numpy()
+
+
+def estimate_data_size(data_frames: List[pd.DataFrame], base_frames: List[pd.DataFrame]) -> int:
+    """Bytes of the columns the corruption replaced. The others share their memory with the base datasets, which are
+    held anyway, so they are not charged."""
+    size = 0
+    for df in data_frames:
+        for column in df.columns:
+            values = _column_values(df[column])
+            if not any(column in base.columns and np.may_share_memory(values, _column_values(base[column]))
+                       for base in base_frames):
+                size += int(df[column].memory_usage(deep=True, index=False))
+    return size
+
+
+_data_cache = ResultCache('corrupted_data', CORRUPTED_DATA_CACHE_MAX_ENTRIES, CORRUPTED_DATA_CACHE_MAX_BYTES)
+
+
+def get_corrupted_data(recipe: DataRecipe) -> List[pd.DataFrame]:
+    """Data the check ran on, as returned by the run module's corrupt on the recipe's dataset."""
+    key = build_cache_key(recipe['run_module'], recipe['dataset_name'], recipe['params'])
+    data_frames = _data_cache.get(key)
+    if data_frames is None:
+        run_module = importlib.import_module(recipe['run_module'])
+        dataset = get_dataset_options()[recipe['dataset_name']]
+        with stage_labels(check=recipe['check_name'], dataset=recipe['dataset_name']):
+            data_frames = [d.data for d in run_module.corrupt(dataset, recipe['params'])]
+        _data_cache.put(key, data_frames, size=estimate_data_size(data_frames, [dataset.train.data, dataset.test.data]))
+    return data_frames
+
+
+def describe_corrupted_data(data_frames: List[pd.DataFrame]) -> str:
+    # Checks running on train and test datasets always corrupt the test dataset, which is the last one
+    return 'test dataset' if len(data_frames) == 2 else 'dataset'
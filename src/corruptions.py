@@ -1,67 +1,140 @@
-import random
+import copy
+from typing import List, Sequence
 
 import numpy as np
 import pandas as pd
 from deepchecks.tabular import Dataset
 
 
-def insert_numerical_drift(column: pd.Series, mean: float, std: float):
-    return column + np.random.normal(mean, std, size=(column.shape[0]))
+def replace_column(dataset: Dataset, column: str, values) -> Dataset:
+    """Copy of the dataset with the column's values replaced.
 
+    Only the new column is allocated, the other columns are shared with the given dataset. Dataset.copy would copy the
+    whole data and infer its columns again, which costs more than most corruptions, so the dataset's attributes are
+    reused instead. They stay valid as the column keeps its role (feature type or label).
+    """
+    new_data = dataset.data.copy(deep=False)
+    new_data[column] = values
+    new_dataset = copy.copy(dataset)
+    new_dataset._data = new_data
+    return new_dataset
 
-def insert_categorical_drift(column: pd.Series, percent: int, category: str):
-    column = column.to_numpy() if isinstance(column, pd.Series) else column
-    categories = list(set(np.unique(column)) - {category})
-    ratio = percent / 100
-    category_count = np.count_nonzero(column == category)
-    category_ratio = category_count / column.shape[0]
-    amount_to_replace = int(column.shape[0] * (ratio - category_ratio))
-    if amount_to_replace == 0:
-        return column
 
-    possible_indices = np.where(column != category) if amount_to_replace > 0 else np.where(column == category)
-    indices_to_replace = np.random.choice(possible_indices[0], abs(amount_to_replace), replace=False)
-    for index in indices_to_replace:
-        column[index] = category if amount_to_replace > 0 else np.random.choice(categories)
+def insert_numerical_drift(column: pd.Series, mean: float, std: float, rng: np.random.Generator):
+    return column + rng.normal(mean, std, size=(column.shape[0]))
+
+
+def insert_categorical_drift(column: pd.Series, percent: int, category: str, rng: np.random.Generator):
+    if isinstance(column, pd.Series):
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # Drift the integer codes and rebuild the categorical, so the dtype is kept
+            codes = column.cat.codes.to_numpy()
+            category_code = column.cat.categories.get_loc(category)
+            other_codes = np.flatnonzero(np.bincount(codes[codes >= 0], minlength=len(column.cat.categories)))
+            new_codes = _drift_category(codes, percent, category_code, other_codes[other_codes != category_code], rng)
+            new_values = pd.Categorical.from_codes(new_codes, dtype=column.dtype)
+        else:
+            values = column.to_numpy()
+            new_values = _drift_category(values, percent, category, _other_categories(values, category), rng)
+        return pd.Series(new_values, index=column.index, name=column.name)
+
+    return _drift_category(column, percent, category, _other_categories(column, category), rng)
 
-    return column
 
+def _other_categories(values: np.ndarray, category):
+    unique_values = pd.unique(values)
+    return unique_values[unique_values != category]
 
-def insert_duplicates(data: pd.DataFrame, rows_to_duplicate_num: int, percent: int):
-    np_data = data.to_numpy()
-    indices_to_duplicate = np.random.choice(len(data), size=rows_to_duplicate_num, replace=False)
-    probabilities = np.random.default_rng().random(rows_to_duplicate_num)
+
+def _drift_category(values: np.ndarray, percent: int, category, other_categories: np.ndarray,
+                    rng: np.random.Generator):
+    is_category = values == category
+    # Counted in rows, as subtracting the ratios loses a row to the float rounding (e.g. 1000 * (0.1 - 0.3))
+    amount_to_replace = round(values.shape[0] * percent / 100) - np.count_nonzero(is_category)
+    if amount_to_replace == 0:
+        return values
+
+    values = values.copy()
+    if amount_to_replace > 0:
+        # Increase the category share by overriding rows of other categories
+        indices_to_replace = rng.choice(np.flatnonzero(~is_category), amount_to_replace, replace=False)
+        values[indices_to_replace] = category
+    else:
+        # Decrease the category share by spreading its rows between the other categories
+        indices_to_replace = rng.choice(np.flatnonzero(is_category), -amount_to_replace, replace=False)
+        values[indices_to_replace] = rng.choice(other_categories, -amount_to_replace)
+    return values
+
+
+def insert_duplicates(data: pd.DataFrame, rows_to_duplicate_num: int, percent: int, rng: np.random.Generator):
+    indices_to_duplicate = rng.choice(len(data), size=rows_to_duplicate_num, replace=False)
+    probabilities = rng.random(rows_to_duplicate_num)
     probabilities = probabilities / np.sum(probabilities)
     amount_to_replace = min(int(len(data) * percent / 100), len(data))
-    rows_to_put = np_data[np.random.choice(indices_to_duplicate, size=amount_to_replace, p=probabilities)]
-    indices_to_replace = np.random.choice(len(data), size=amount_to_replace, replace=False)
-    np_data[indices_to_replace] = rows_to_put
-    return pd.DataFrame(np_data, columns=data.columns)
+    indices_to_replace = rng.choice(len(data), size=amount_to_replace, replace=False)
+    # Build the row positions of the new frame and take them in one pass, which copies the data column by column
+    # and keeps the original dtypes (instead of going through a single object matrix)
+    row_positions = np.arange(len(data))
+    row_positions[indices_to_replace] = rng.choice(indices_to_duplicate, size=amount_to_replace, p=probabilities)
+    new_data = data.take(row_positions)
+    new_data.index = data.index
+    return new_data
 
 
 def relate_column_to_label(dataset: Dataset, column: pd.Series, label_power: float):
     return column + (dataset.data[dataset.label_name] * column.mean() * label_power)
 
 
-def insert_variants(column: pd.Series, percent: int):
-    def flip_case(x):
-        return x.upper() if x.islower() else x.lower()
-
-    functions = [
-        lambda x: flip_case(x[0]) + x[1:],  # Switch upper lower first letter
-        lambda x: x.replace(' ', '-'),  # Replace space with -
-        lambda x: x + '.',  # Add . at the end
-        lambda x: x.upper(),  # Upper case all letters
-        lambda x: x.lower(),  # Lower case all letters
-        lambda x: ' ' + x,  # Add space at the beginning
-    ]
-
-    column = column.to_numpy()
-    value = np.random.choice(column)
-    variants = [f(value) for f in functions if f(value) != value]
-    size = min(int(len(column) * percent / 100), len(column))
-    indices_to_replace = np.random.choice(len(column), size=size, replace=False)
-    for index in indices_to_replace:
-        column[index] = random.choice(variants)
-    return column
-
+def _flip_case(x):
+    return x.upper() if x.islower() else x.lower()
+
+
+VARIANT_FUNCTIONS = [
+    lambda x: _flip_case(x[0]) + x[1:],  # Switch upper lower first letter
+    lambda x: x.replace(' ', '-'),  # Replace space with -
+    lambda x: x + '.',  # Add . at the end
+    lambda x: x.upper(),  # Upper case all letters
+    lambda x: x.lower(),  # Lower case all letters
+    lambda x: ' ' + x,  # Add space at the beginning
+]
+
+
+def get_variants(value) -> List[str]:
+    if not isinstance(value, str) or not value:
+        return []
+    # dict keeps the variants unique and in a deterministic order
+    return list(dict.fromkeys(variant for variant in (f(value) for f in VARIANT_FUNCTIONS) if variant != value))
+
+
+def insert_variants(column: pd.Series, percent: int, rng: np.random.Generator, values: Sequence[str] = None):
+    """Replace percent of the rows of the given values (or of all the values if None) with variants of themselves.
+
+    The variants are computed once per unique value, so the cost depends on the number of unique values and not on
+    the number of rows.
+    """
+    series = column if isinstance(column, pd.Series) else pd.Series(column)
+    values = None if values is None else set(values)
+    codes, uniques = pd.factorize(series)
+    variants = [get_variants(value) if values is None or value in values else [] for value in uniques]
+    variants_count = np.array([len(v) for v in variants] + [0])
+    variants_table = np.empty((len(variants) + 1, max(variants_count.max(), 1)), dtype=object)
+    for index, value_variants in enumerate(variants):
+        variants_table[index, :len(value_variants)] = value_variants
+
+    # Missing values have code -1, which points to the last (empty) row of the table
+    candidate_indices = np.flatnonzero(variants_count[codes] > 0)
+    size = min(int(len(candidate_indices) * percent / 100), len(candidate_indices))
+    indices_to_replace = rng.choice(candidate_indices, size=size, replace=False)
+    replaced_codes = codes[indices_to_replace]
+    variant_indices = (rng.random(size) * variants_count[replaced_codes]).astype(int)
+
+    new_values = series.to_numpy(dtype=object, copy=True)
+    new_values[indices_to_replace] = variants_table[replaced_codes, variant_indices]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        new_categories = pd.Index(pd.unique(new_values[indices_to_replace]))
+        new_categories = new_categories[~new_categories.isin(categories)]
+        new_values = pd.Categorical(new_values, categories=categories.append(new_categories))
+    if isinstance(column, pd.Series):
+        return pd.Series(new_values, index=column.index, name=column.name)
+    return new_values
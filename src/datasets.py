@@ -1,26 +1,87 @@
-from dataclasses import dataclass
-from typing import Any, Optional
+import importlib
+import json
+import os
+import threading
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import streamlit as st
-from deepchecks.tabular import Dataset
-from deepchecks.tabular.datasets.classification import iris, breast_cancer, adult
-from deepchecks.tabular.datasets.regression import avocado
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
-__all__ = ['get_dataset_options', 'DatasetOption']
+from constants import DATASETS_SAMPLE_SIZE, SNAPSHOT_DIR
+from metrics import time_stage
+
+__all__ = ['get_dataset_options', 'build_dataset_options', 'DatasetOption', 'save_snapshot']
+
+# deepchecks is imported only when a dataset is actually loaded, to keep the app's import time short
+if TYPE_CHECKING:
+    from deepchecks.tabular import Dataset
 
 
 @dataclass
 class DatasetOption:
-    train: Dataset
-    test: Dataset
-    model: Any
+    """Dataset shown in the demo. The data and the model are loaded only on first access.
+
+    They are read from the local snapshot if one was built (see build_snapshot.py) with the same sample size,
+    otherwise the loader is called.
+    """
+    # None for datasets which are never snapshotted, e.g. the benchmark's resampled datasets
+    snapshot_name: Optional[str]
+    # Called with the sample size
+    loader: Callable[[Optional[int]], Tuple['Dataset', 'Dataset', Any]]
     features_importance: Optional[pd.Series]
     dataset_params: dict
     model_snippet: str
     contain_categorical_columns: bool
+    # Rows of each of the train and test datasets, None for all the rows
+    sample_size: Optional[int] = None
+    _loaded: Optional[Tuple['Dataset', 'Dataset', Any]] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @property
+    def train(self) -> 'Dataset':
+        return self.load()[0]
+
+    @property
+    def test(self) -> 'Dataset':
+        return self.load()[1]
+
+    @property
+    def model(self) -> Any:
+        return self.load()[2]
+
+    def load(self):
+        # The options are shared between all sessions, so make sure concurrent first accesses load only once
+        with self._lock:
+            if self._loaded is None:
+                # The spinner is shown only when loading from a script run, and not e.g. from the warm-up
+                spinner = st.spinner('Loading dataset...') if get_script_run_ctx(suppress_warning=True) else nullcontext()
+                with spinner, time_stage('dataset_load'):
+                    snapshot_path = Path(SNAPSHOT_DIR) / self.snapshot_name if self.snapshot_name else None
+                    loaded = None
+                    if snapshot_path is not None and (snapshot_path / SNAPSHOT_META_FILE).exists():
+                        loaded = load_snapshot(snapshot_path, self.sample_size)
+                    if loaded is None:
+                        loaded = self.loader(self.sample_size)
+                    train, test, model = loaded
+                    self._loaded = compact_dtypes(train), compact_dtypes(test), model
+        return self._loaded
 
 
+SNAPSHOT_META_FILE = 'meta.json'
+# Snapshots of other formats are ignored and the datasets are loaded instead. Version 1 stored lossy float32 features
+SNAPSHOT_FORMAT_VERSION = 2
+
+# Fixed, so all processes (and all restarts) sample the exact same rows
+SAMPLE_RANDOM_STATE = 42
+# Default sample size of the big datasets, the small ones are used whole
+SAMPLE_SIZE = 1000
+
 # The avocado model doesn't have FI and calculating it takes a long time and memory. so hard-coding it here.
 AVOCADO_FI = pd.Series({
     'Total Volume': 0.073976,
@@ -37,54 +98,139 @@ AVOCADO_FI = pd.Series({
 })
 
 
-@st.cache_data(show_spinner=False)
+def get_sample_size(snapshot_name: str, default: Optional[int]) -> Optional[int]:
+    sample_size = os.environ.get(f'DATASETS_SAMPLE_SIZE_{snapshot_name.upper()}', DATASETS_SAMPLE_SIZE)
+    if sample_size is None:
+        return default
+    return int(sample_size) if sample_size else None
+
+
+def sample_dataset(dataset: 'Dataset', sample_size: Optional[int]) -> 'Dataset':
+    if sample_size is None:
+        return dataset
+    if sample_size <= len(dataset.data):
+        return dataset.sample(sample_size, random_state=SAMPLE_RANDOM_STATE)
+    # Larger than the data, so the rows are drawn with replacement to scale it up
+    data = dataset.data.sample(sample_size, replace=True, random_state=SAMPLE_RANDOM_STATE)
+    return dataset.copy(data.reset_index(drop=True))
+
+
+def compact_dtypes(dataset: 'Dataset') -> 'Dataset':
+    """Store the categorical features as pandas categories and the numerical features in the smallest dtype which
+    keeps their exact values, so large samples take a fraction of the memory. The label is left as is."""
+    data = dataset.data
+    columns = {}
+    for column in dataset.cat_features:
+        if not isinstance(data[column].dtype, pd.CategoricalDtype):
+            columns[column] = data[column].astype('category')
+    for column in dataset.numerical_features:
+        kind = data[column].dtype.kind
+        if kind in 'iuf':
+            values = pd.to_numeric(data[column], downcast='float' if kind == 'f' else 'integer')
+            # pandas downcasts floats when they are only close to their float32 values, so they are kept only if the
+            # round trip is exact
+            if kind == 'f' and not np.array_equal(values.to_numpy(dtype='float64'), data[column].to_numpy(),
+                                                  equal_nan=True):
+                continue
+            if values.dtype != data[column].dtype:
+                columns[column] = values
+    if not columns:
+        return dataset
+    return dataset.copy(data.assign(**columns))
+
+
+def load_deepchecks_dataset(dataset_module_path: str, sample_size: Optional[int]):
+    dataset_module = importlib.import_module(dataset_module_path)
+    train, test = dataset_module.load_data(as_train_test=True)
+    return sample_dataset(train, sample_size), sample_dataset(test, sample_size), dataset_module.load_fitted_model()
+
+
+def save_snapshot(option: DatasetOption, snapshot_path: Path):
+    import deepchecks
+    import joblib
+
+    train, test, model = option.loader(option.sample_size)
+    train, test = compact_dtypes(train), compact_dtypes(test)
+    snapshot_path.mkdir(parents=True, exist_ok=True)
+    train.data.to_parquet(snapshot_path / 'train.parquet')
+    test.data.to_parquet(snapshot_path / 'test.parquet')
+    joblib.dump(model, snapshot_path / 'model.joblib')
+    features_importance = option.features_importance
+    meta = dict(dataset_params=option.dataset_params, model_snippet=option.model_snippet,
+                features_importance=None if features_importance is None else features_importance.to_dict(),
+                sample_size=option.sample_size, deepchecks_version=deepchecks.__version__,
+                format_version=SNAPSHOT_FORMAT_VERSION)
+    # Meta file is written last, it marks the snapshot as complete
+    (snapshot_path / SNAPSHOT_META_FILE).write_text(json.dumps(meta, indent=4))
+
+
+def load_snapshot(snapshot_path: Path, sample_size: Optional[int]):
+    """Returns None if the snapshot was built with another sample size or format."""
+    import joblib
+    from deepchecks.tabular import Dataset
+
+    meta = json.loads((snapshot_path / SNAPSHOT_META_FILE).read_text())
+    # Snapshots without a sample size were built with the default ones
+    if 'sample_size' in meta and meta['sample_size'] != sample_size:
+        print(f'Snapshot {snapshot_path} has sample size {meta["sample_size"]} instead of {sample_size}, '
+              f'loading the dataset instead')
+        return None
+    if meta.get('format_version', 1) != SNAPSHOT_FORMAT_VERSION:
+        print(f'Snapshot {snapshot_path} has an old format, loading the dataset instead')
+        return None
+    train = pd.read_parquet(snapshot_path / 'train.parquet', memory_map=True)
+    test = pd.read_parquet(snapshot_path / 'test.parquet', memory_map=True)
+    # Model's numpy arrays are memory-mapped instead of copied into each process memory
+    model = joblib.load(snapshot_path / 'model.joblib', mmap_mode='r')
+    return Dataset(train, **meta['dataset_params']), Dataset(test, **meta['dataset_params']), model
+
+
+def build_dataset_options():
+    return {
+        'avocado (regression)': DatasetOption(
+            snapshot_name='avocado',
+            loader=partial(load_deepchecks_dataset, 'deepchecks.tabular.datasets.regression.avocado'),
+            features_importance=AVOCADO_FI,
+            dataset_params=dict(label='AveragePrice', cat_features=['region', 'type'],
+                                datetime_name='Date'),
+            model_snippet=('from deepchecks.tabular.datasets.regression import avocado\n\n'
+                           'model = avocado.load_fitted_model()'),
+            contain_categorical_columns=True,
+            sample_size=get_sample_size('avocado', SAMPLE_SIZE)),
+        'iris (classification)': DatasetOption(
+            snapshot_name='iris',
+            loader=partial(load_deepchecks_dataset, 'deepchecks.tabular.datasets.classification.iris'),
+            features_importance=None,
+            dataset_params=dict(label='target', cat_features=[], label_type='classification_label'),
+            model_snippet=('from deepchecks.tabular.datasets.classification import iris\n\n'
+                           'model = iris.load_fitted_model()'),
+            contain_categorical_columns=False,
+            sample_size=get_sample_size('iris', None)),
+        'breast_cancer (classification)': DatasetOption(
+            snapshot_name='breast_cancer',
+            loader=partial(load_deepchecks_dataset, 'deepchecks.tabular.datasets.classification.breast_cancer'),
+            features_importance=None,
+            dataset_params=dict(label='target', cat_features=[], label_type='classification_label'),
+            model_snippet=('from deepchecks.tabular.datasets.classification import breast_cancer\n\n'
+                           'model = breast_cancer.load_fitted_model()'),
+            contain_categorical_columns=False,
+            sample_size=get_sample_size('breast_cancer', None)),
+        # 'adult (classification)': DatasetOption(
+        #     snapshot_name='adult',
+        #     loader=partial(load_deepchecks_dataset, 'deepchecks.tabular.datasets.classification.adult'),
+        #     features_importance=None,
+        #     dataset_params=dict(label='income', cat_features=['workclass', 'education', 'marital-status',
+        #                         'occupation', 'relationship', 'race', 'sex', 'native-country'],
+        #                         label_type='classification_label'),
+        #     model_snippet=('from deepchecks.tabular.datasets.classification import adult\n\n'
+        #                    'model = adult.load_fitted_model()'),
+        #     contain_categorical_columns=True,
+        #     sample_size=get_sample_size('adult', SAMPLE_SIZE)),
+
+    }
+
+
+@st.cache_resource(show_spinner=False)
 def get_dataset_options():
-    with st.spinner('Loading datasets...'):
-        sample_size = 1000
-        iris_data = iris.load_data(as_train_test=True)
-        avocado_data = avocado.load_data(as_train_test=True)
-        breast_cancer_data = breast_cancer.load_data(as_train_test=True)
-        adult_data = adult.load_data(as_train_test=True)
-
-        return {
-            'avocado (regression)': DatasetOption(
-                train=avocado_data[0].sample(sample_size),
-                test=avocado_data[1].sample(sample_size),
-                model=avocado.load_fitted_model(),
-                features_importance=AVOCADO_FI,
-                dataset_params=dict(label='AveragePrice', cat_features=['region', 'type'],
-                                    datetime_name='Date'),
-                model_snippet=('from deepchecks.tabular.datasets.regression import avocado\n\n'
-                               'model = avocado.load_fitted_model()'),
-                contain_categorical_columns=True),
-            'iris (classification)': DatasetOption(
-                train=iris_data[0].sample(sample_size),
-                test=iris_data[1].sample(sample_size),
-                model=iris.load_fitted_model(),
-                features_importance=None,
-                dataset_params=dict(label='target', cat_features=[], label_type='classification_label'),
-                model_snippet=('from deepchecks.tabular.datasets.classification import iris\n\n'
-                               'model = iris.load_fitted_model()'),
-                contain_categorical_columns=False),
-            'breast_cancer (classification)': DatasetOption(
-                train=breast_cancer_data[0].sample(sample_size),
-                test=breast_cancer_data[1].sample(sample_size),
-                model=breast_cancer.load_fitted_model(),
-                features_importance=None,
-                dataset_params=dict(label='target', cat_features=[], label_type='classification_label'),
-                model_snippet=('from deepchecks.tabular.datasets.classification import breast_cancer\n\n'
-                               'model = breast_cancer.load_fitted_model()'),
-                contain_categorical_columns=False),
-            # 'adult (classification)': DatasetOption(
-            #     train=adult_data[0].sample(sample_size),
-            #     test=adult_data[1].sample(sample_size),
-            #     model=adult.load_fitted_model(),
-            #     features_importance=None,
-            #     dataset_params=dict(label='income', cat_features=['workclass', 'education', 'marital-status',
-            #                         'occupation', 'relationship', 'race', 'sex', 'native-country'],
-            #                         label_type='classification_label'),
-            #     model_snippet=('from deepchecks.tabular.datasets.classification import adult\n\n'
-            #                    'model = adult.load_fitted_model()'),
-            #     contain_categorical_columns=True),
-
-        }
+    # Shared by all the sessions, so every dataset is loaded once per process
+    return build_dataset_options()
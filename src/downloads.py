@@ -0,0 +1,130 @@
+"""
+Serves the data downloads over HTTP, generated only when the download link is clicked and streamed in chunks.
+Every rerun only registers a reference to the data to download, so it costs nothing when nobody downloads.
+"""
+import io
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+import tornado.ioloop
+import tornado.web
+
+from metrics import record_stages
+from server_routes import add_route, url_path
+
+__all__ = ['DATA_FORMATS', 'ensure_download_route', 'register_download', 'serialize_data']
+
+
+@dataclass(frozen=True)
+class DataFormat:
+    label: str
+    # Name of the pandas function which reads the format, used in the snippets
+    read_function: str
+    mimetype: str
+
+
+# Keyed by the file extension
+DATA_FORMATS = {
+    'csv': DataFormat(label='CSV', read_function='read_csv', mimetype='text/csv'),
+    'csv.gz': DataFormat(label='CSV (gzip)', read_function='read_csv', mimetype='application/gzip'),
+    'parquet': DataFormat(label='Parquet', read_function='read_parquet', mimetype='application/vnd.apache.parquet'),
+    'feather': DataFormat(label='Feather', read_function='read_feather', mimetype='application/vnd.apache.arrow.file'),
+}
+
+DOWNLOAD_ENDPOINT = 'download'
+DOWNLOAD_CHUNK_ROWS = 10_000
+DOWNLOAD_CHUNK_BYTES = 1024 ** 2
+# Every session registers its own downloads, oldest ones are dropped once the limit is reached
+MAX_REGISTERED_DOWNLOADS = 1024
+
+_downloads = OrderedDict()
+_downloads_lock = threading.Lock()
+
+
+def register_download(key: str, filename: str, data_provider: Callable[[], pd.DataFrame],
+                      labels: Dict[str, str] = None) -> str:
+    """Register data to be downloaded and return the download url. The labels are used in the download's metrics."""
+    with _downloads_lock:
+        _downloads[(key, filename)] = data_provider, labels or {}
+        _downloads.move_to_end((key, filename))
+        while len(_downloads) > MAX_REGISTERED_DOWNLOADS:
+            _downloads.popitem(last=False)
+    return url_path(DOWNLOAD_ENDPOINT, key, filename)
+
+
+def get_download(key: str, filename: str) -> Optional[Tuple[Callable[[], pd.DataFrame], Dict[str, str]]]:
+    with _downloads_lock:
+        return _downloads.get((key, filename))
+
+
+def csv_chunk(data: pd.DataFrame, start: int) -> str:
+    return data.iloc[start:start + DOWNLOAD_CHUNK_ROWS].to_csv(index=False, header=start == 0)
+
+
+def serialize_data(data: pd.DataFrame, data_format: str) -> bytes:
+    """Serialize the whole data at once in the given format."""
+    buffer = io.BytesIO()
+    if data_format == 'parquet':
+        data.to_parquet(buffer, index=False)
+    elif data_format == 'feather':
+        # Feather supports only a default index
+        data.reset_index(drop=True).to_feather(buffer)
+    else:
+        data.to_csv(buffer, index=False, compression='gzip' if data_format == 'csv.gz' else None)
+    return buffer.getvalue()
+
+
+def get_data_format(filename: str) -> Optional[str]:
+    return next((data_format for data_format in DATA_FORMATS if filename.endswith(f'.{data_format}')), None)
+
+
+def _timed(func, *args):
+    # The time of the download stage counts only the serialization, and not sending the data to the client
+    start = time.perf_counter()
+    return func(*args), time.perf_counter() - start
+
+
+class DownloadHandler(tornado.web.RequestHandler):
+    async def get(self, key: str, filename: str):
+        download = get_download(key, filename)
+        data_format = get_data_format(filename)
+        if download is None or data_format is None:
+            raise tornado.web.HTTPError(404)
+
+        data_provider, labels = download
+        serialize_seconds = 0.0
+        loop = tornado.ioloop.IOLoop.current()
+        data = await loop.run_in_executor(None, data_provider)
+        self.set_header('Content-Type', DATA_FORMATS[data_format].mimetype)
+        self.set_header('Content-Disposition', f'attachment; filename="{filename}"')
+        # Serialize outside the event loop, so big downloads don't block the app's websockets
+        if data_format in ('csv', 'csv.gz'):
+            # CSV is serialized (and compressed) chunk by chunk
+            compressor = zlib.compressobj(wbits=31) if data_format == 'csv.gz' else None
+            for start in range(0, max(len(data), 1), DOWNLOAD_CHUNK_ROWS):
+                chunk, seconds = await loop.run_in_executor(None, _timed, csv_chunk, data, start)
+                serialize_seconds += seconds
+                chunk = chunk.encode()
+                self.write(compressor.compress(chunk) if compressor else chunk)
+                await self.flush()
+            if compressor:
+                self.write(compressor.flush())
+        else:
+            # Columnar formats are written as a whole, and only sent in chunks
+            content, serialize_seconds = await loop.run_in_executor(None, _timed, serialize_data, data, data_format)
+            for start in range(0, len(content), DOWNLOAD_CHUNK_BYTES):
+                self.write(content[start:start + DOWNLOAD_CHUNK_BYTES])
+                await self.flush()
+        record_stages([('download', labels, serialize_seconds)])
+
+
+@st.cache_resource(show_spinner=False)
+def ensure_download_route() -> bool:
+    """Add the download route to the server once per process. Returns False if there is no server to add it to."""
+    return add_route(f'{DOWNLOAD_ENDPOINT}/(\\w+)/([^/]+)', DownloadHandler)
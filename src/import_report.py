@@ -0,0 +1,62 @@
+"""
+Reports the most expensive imports of the app, using python's -X importtime.
+Every module is imported in a fresh interpreter, so the numbers are comparable between runs and versions.
+Usage: python src/import_report.py [--modules checks run_train_test_feature_drift] [--top 20] [--json report.json]
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+
+def measure_imports(module_name: str):
+    """Import the module in a new interpreter and return the import time of every module it imported."""
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module_name}'],
+                             cwd=Path(__file__).parent, capture_output=True, text=True, check=True)
+    imports = []
+    for line in process.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append({'module': name, 'self_us': int(self_us), 'cumulative_us': int(cumulative_us),
+                            'depth': (len(indent) - 1) // 2})
+    return imports
+
+
+def build_report(module_name: str, top: int):
+    imports = measure_imports(module_name)
+    top_level = [i for i in imports if i['module'] == module_name]
+    return {
+        'module': module_name,
+        'python': sys.version.split()[0],
+        'total_us': top_level[-1]['cumulative_us'] if top_level else sum(i['self_us'] for i in imports),
+        'modules_count': len(imports),
+        'top_cumulative': sorted(imports, key=lambda i: i['cumulative_us'], reverse=True)[:top],
+        'top_self': sorted(imports, key=lambda i: i['self_us'], reverse=True)[:top],
+    }
+
+
+def print_report(report: dict):
+    print(f'{report["module"]}: {report["total_us"] / 1000:.1f} ms, {report["modules_count"]} modules imported')
+    print(f'{"cumulative [ms]":>16} {"self [ms]":>10}  module')
+    for i in report['top_cumulative']:
+        print(f'{i["cumulative_us"] / 1000:>16.1f} {i["self_us"] / 1000:>10.1f}  {i["module"]}')
+    print()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='+', default=['checks'], help='Modules to measure')
+    parser.add_argument('--top', type=int, default=20, help='Number of most expensive imports to report')
+    parser.add_argument('--json', help='Also write the report as JSON to this path')
+    args = parser.parse_args()
+
+    reports = [build_report(module_name, args.top) for module_name in args.modules]
+    for module_report in reports:
+        print_report(module_report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(reports, indent=4))
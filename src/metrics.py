@@ -0,0 +1,158 @@
+"""
+In-process metrics of the check runs, served in the Prometheus text format at /metrics, so a local Prometheus (or just
+curl) can scrape them without any outside service.
+Every stage of a run (dataset load, corruption, check run, html rendering, value JSON encoding and download encoding)
+is timed into a histogram labeled with the check and the dataset. The labels are taken from the calling thread, set
+with stage_labels where the check and dataset are known, so the stages themselves don't need to know them.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import streamlit as st
+import tornado.web
+
+from server_routes import add_route
+from session_memory import get_sessions_memory
+
+__all__ = ['stage_labels', 'get_stage_labels', 'time_stage', 'capture_stages', 'record_stages', 'count_cache_request',
+           'render_metrics', 'ensure_metrics_route']
+
+METRICS_ENDPOINT = 'metrics'
+# Prometheus' default buckets, extended for the slow checks
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+STAGE_LABELS = ('check', 'dataset')
+
+# Stage name, its labels and its duration in seconds
+StageObservation = Tuple[str, Dict[str, str], float]
+
+
+@dataclass
+class Histogram:
+    bucket_counts: List[int] = field(default_factory=lambda: [0] * len(HISTOGRAM_BUCKETS))
+    count: int = 0
+    total: float = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(HISTOGRAM_BUCKETS, value)
+        if index < len(HISTOGRAM_BUCKETS):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.total += value
+
+
+# Keyed by (stage, check, dataset)
+_stage_seconds: Dict[Tuple[str, ...], Histogram] = {}
+# Keyed by (cache, result)
+_cache_requests: Dict[Tuple[str, str], int] = {}
+_metrics_lock = threading.Lock()
+_local = threading.local()
+
+
+@contextmanager
+def stage_labels(**labels: str):
+    """Label the stages timed by the current thread within the block."""
+    previous = getattr(_local, 'labels', {})
+    _local.labels = {**previous, **labels}
+    try:
+        yield
+    finally:
+        _local.labels = previous
+
+
+def get_stage_labels() -> Dict[str, str]:
+    return dict(getattr(_local, 'labels', {}))
+
+
+@contextmanager
+def time_stage(stage: str, **labels: str):
+    """Time the block (or the decorated function) as the given stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observation = (stage, {**get_stage_labels(), **labels}, time.perf_counter() - start)
+        captured = getattr(_local, 'captured', None)
+        if captured is not None:
+            captured.append(observation)
+        else:
+            record_stages([observation])
+
+
+@contextmanager
+def capture_stages():
+    """Collect the stages timed by the current thread within the block instead of recording them, e.g. in a worker
+    process whose stages are recorded by the server process."""
+    _local.captured = []
+    try:
+        yield _local.captured
+    finally:
+        _local.captured = None
+
+
+def record_stages(observations: List[StageObservation]):
+    with _metrics_lock:
+        for stage, labels, seconds in observations:
+            key = (stage,) + tuple(labels.get(label, '') for label in STAGE_LABELS)
+            _stage_seconds.setdefault(key, Histogram()).observe(seconds)
+
+
+def count_cache_request(cache: str, hit: bool):
+    key = (cache, 'hit' if hit else 'miss')
+    with _metrics_lock:
+        _cache_requests[key] = _cache_requests.get(key, 0) + 1
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def render_metrics(gauges: Optional[Dict[str, float]] = None, counters: Optional[Dict[str, float]] = None) -> str:
+    """All the metrics in the Prometheus text exposition format."""
+    lines = ['# HELP app_stage_seconds Duration of the stages of the check runs.',
+             '# TYPE app_stage_seconds histogram']
+    with _metrics_lock:
+        for (stage, *values), histogram in sorted(_stage_seconds.items()):
+            labels = dict(stage=stage, **dict(zip(STAGE_LABELS, values)))
+            cumulative = 0
+            for bucket, bucket_count in zip(HISTOGRAM_BUCKETS, histogram.bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'app_stage_seconds_bucket{_format_labels(dict(labels, le=str(bucket)))} {cumulative}')
+            lines.append(f'app_stage_seconds_bucket{_format_labels(dict(labels, le="+Inf"))} {histogram.count}')
+            lines.append(f'app_stage_seconds_sum{_format_labels(labels)} {histogram.total}')
+            lines.append(f'app_stage_seconds_count{_format_labels(labels)} {histogram.count}')
+        lines += ['# HELP app_cache_requests_total Lookups of the in-process caches.',
+                  '# TYPE app_cache_requests_total counter']
+        for (cache, result), count in sorted(_cache_requests.items()):
+            lines.append(f'app_cache_requests_total{_format_labels(dict(cache=cache, result=result))} {count}')
+    for metric_type, metrics in (('gauge', gauges), ('counter', counters)):
+        for name, value in (metrics or {}).items():
+            lines += [f'# TYPE {name} {metric_type}', f'{name} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        # Imported here, as the results cache itself counts its requests with this file
+        from result_cache import result_cache
+
+        sessions_memory = get_sessions_memory()
+        gauges = {
+            'app_result_cache_entries': len(result_cache),
+            'app_result_cache_bytes': result_cache.total_bytes,
+            'app_sessions': sessions_memory.sessions,
+            'app_sessions_state_bytes': sessions_memory.total_bytes,
+        }
+        counters = {'app_sessions_evicted_total': sessions_memory.evicted_sessions}
+        self.set_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.write(render_metrics(gauges, counters))
+
+
+@st.cache_resource(show_spinner=False)
+def ensure_metrics_route() -> bool:
+    """Add the metrics route to the server once per process. Returns False if there is no server to add it to."""
+    return add_route(METRICS_ENDPOINT, MetricsHandler)
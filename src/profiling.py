@@ -0,0 +1,110 @@
+"""
+Opt-in profiling of whole script reruns, to find out why a check is slow on a given dataset with given parameters.
+A rerun is profiled when PROFILE_RERUNS is set, or when its URL has the profile query param with the operator's
+PROFILE_TOKEN. The rerun runs under cProfile, while a sampler thread collects its stacks, and both are written to
+PROFILE_DIR: a pstats file, a collapsed stacks file (for flamegraph.pl or speedscope) and a JSON of the tags.
+When profiling is not configured profile_rerun does nothing, so the reruns pay nothing for it.
+"""
+import cProfile
+import hmac
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+import streamlit as st
+
+from constants import PROFILE_DIR, PROFILE_QUERY_PARAM, PROFILE_RERUNS, PROFILE_SAMPLE_SECONDS, PROFILE_TOKEN
+
+__all__ = ['profile_rerun', 'is_profiling', 'tag_profile']
+
+_local = threading.local()
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of another thread, counting the collapsed stacks."""
+
+    def __init__(self, thread_id: int):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(PROFILE_SAMPLE_SECONDS):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})')
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def _is_requested() -> bool:
+    if PROFILE_RERUNS:
+        return True
+    token = st.experimental_get_query_params().get(PROFILE_QUERY_PARAM, [''])[0]
+    # Compared as bytes, as compare_digest rejects non-ASCII strings
+    return hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+def is_profiling() -> bool:
+    return getattr(_local, 'tags', None) is not None
+
+
+def tag_profile(**tags):
+    """Add tags (e.g. the check and the widget values) to the profile of the current rerun, if it's profiled."""
+    if is_profiling():
+        _local.tags.update(tags)
+
+
+def _write_profile(profiler: cProfile.Profile, sampler: StackSampler, tags: Dict, seconds: float) -> Path:
+    profile_dir = Path(PROFILE_DIR)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    name_parts = [datetime.now().strftime('%Y%m%d-%H%M%S-%f')]
+    name_parts += [re.sub(r'\W+', '_', str(tags[tag])).strip('_') for tag in ('check', 'dataset') if tag in tags]
+    name = '-'.join(name_parts)
+    profiler.dump_stats(profile_dir / f'{name}.pstats')
+    with open(profile_dir / f'{name}.collapsed', 'w') as f:
+        f.writelines(f'{stack} {count}\n' for stack, count in sampler.stacks.most_common())
+    with open(profile_dir / f'{name}.json', 'w') as f:
+        json.dump(dict(tags, seconds=seconds), f, indent=2, default=str)
+    return profile_dir / name
+
+
+@contextmanager
+def _profile():
+    _local.tags = {}
+    sampler = StackSampler(threading.get_ident())
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+        seconds = time.perf_counter() - start
+        tags, _local.tags = _local.tags, None
+        path = _write_profile(profiler, sampler, tags, seconds)
+        print(f'Rerun profile written to {path} ({seconds:.2f} seconds)')
+
+
+def profile_rerun():
+    """Profile the script rerun within the block, if it was requested."""
+    if not PROFILE_RERUNS and not PROFILE_TOKEN:
+        return nullcontext()
+    return _profile() if _is_requested() else nullcontext()
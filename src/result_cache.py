@@ -0,0 +1,130 @@
+"""
+Process-wide cache for check results.
+Streamlit re-runs the whole script on every interaction (opening an expander, scrolling, etc.), so without caching
+the selected check would run again on every rerun even when none of its inputs changed.
+"""
+import json
+import sys
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Set, TypedDict
+
+import numpy as np
+import pandas as pd
+
+from constants import RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES
+from encoder import AppEncoder
+from metrics import count_cache_request
+
+if TYPE_CHECKING:
+    from corrupted_data import DataRecipe
+
+__all__ = ['CachedResult', 'ResultCache', 'result_cache', 'build_cache_key']
+
+
+class CachedResult(TypedDict):
+    html: str
+    value: Any
+    # Snippet for each of the download data formats
+    snippets: Dict[str, str]
+    # The corrupted data isn't kept, it's rebuilt from the recipe when shown or downloaded
+    data_recipe: 'DataRecipe'
+
+
+def build_cache_key(check_name: str, dataset_name: str, params: dict) -> str:
+    """Build a key out of everything that affects the check result."""
+    return json.dumps([check_name, dataset_name, params], sort_keys=True, cls=AppEncoder)
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """Approximate number of bytes held by the object and the containers and frames within it. Objects referenced
+    more than once are counted once."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        return int(np.sum(obj.memory_usage(deep=True)))
+    if isinstance(obj, np.ndarray) and obj.dtype != object:
+        return obj.nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, np.ndarray):
+        size += sum(deep_sizeof(item, seen) for item in obj.flat)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+def estimate_size(entry: CachedResult) -> int:
+    """Approximate number of bytes held by a cached entry."""
+    return (len(entry['html']) + sum(len(snippet) for snippet in entry['snippets'].values())
+            + deep_sizeof(entry['value']) + deep_sizeof(entry['data_recipe']))
+
+
+class ResultCache:
+    """Thread-safe LRU cache bounded both by number of entries and by approximate memory usage."""
+
+    def __init__(self, name: str, max_entries: int, max_bytes: int, sizeof: Callable[[Any], int] = estimate_size):
+        # Name of the cache in the metrics
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        count_cache_request(self.name, hit=entry is not None)
+        return entry
+
+    def __contains__(self, key: str) -> bool:
+        # Neither counted in the metrics nor marked as recently used, for lookups which don't serve the entry
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: str, entry: Any, size: Optional[int] = None):
+        """Add the entry, with its size if it was already estimated by the caller."""
+        size = self.sizeof(entry) if size is None else size
+        # Entry that can't fit even in an empty cache is not stored at all
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._sizes[key] = size
+            self._total_bytes += size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def entries(self) -> list:
+        with self._lock:
+            return list(self._entries.values())
+
+    def _remove(self, key: str):
+        del self._entries[key]
+        self._total_bytes -= self._sizes.pop(key)
+
+
+result_cache = ResultCache('results', RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES)
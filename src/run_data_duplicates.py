@@ -1,27 +1,49 @@
+from typing import Tuple
+
+import numpy as np
 import streamlit as st
 from deepchecks.tabular import Dataset
 from deepchecks.tabular.checks import DataDuplicates
 
 from corruptions import insert_duplicates
 from datasets import DatasetOption
+from metrics import time_stage
 from streamlit_persist import persist
-from utils import build_snippet, put_data_on_state
-
+from utils import build_snippets
 
-def run(dataset_option: DatasetOption, check_param_col, manipulate_col):
-    dataset: Dataset = dataset_option.train
 
+def get_params(dataset_option: DatasetOption, check_param_col, manipulate_col):
+    defaults = get_default_params(dataset_option)
     with check_param_col:
         st.text('No parameters to control')
     with manipulate_col:
         st.subheader('Add Corruption to Data')
-        rows_to_duplicate = st.slider('Number rows to duplicate', min_value=1, max_value=5, value=5, key=persist('data_duplicates_rows_to_duplicate'))
-        percent = st.slider('Duplicate percent', value=20, min_value=0, max_value=100, step=1, key=persist('data_duplicates_percent'))
-        if percent > 0:
-            new_data = insert_duplicates(dataset.data, rows_to_duplicate, percent)
-            dataset = dataset.copy(new_data)
+        rows_to_duplicate = st.slider('Number rows to duplicate', min_value=1, max_value=5, value=defaults['rows_to_duplicate'], key=persist('data_duplicates_rows_to_duplicate'))
+        percent = st.slider('Duplicate percent', value=defaults['percent'], min_value=0, max_value=100, step=1, key=persist('data_duplicates_percent'))
+    return dict(rows_to_duplicate=rows_to_duplicate, percent=percent)
+
+
+def get_default_params(dataset_option: DatasetOption) -> dict:
+    """Parameters of the check's first view, used by the warm-up. get_params starts its widgets from them."""
+    return dict(rows_to_duplicate=5, percent=20)
+
+
+@time_stage('corruption')
+def corrupt(dataset_option: DatasetOption, params: dict) -> Tuple[Dataset]:
+    """Datasets to run the check on, after the corruption is applied."""
+    dataset: Dataset = dataset_option.train
+
+    if params['percent'] > 0:
+        new_data = insert_duplicates(dataset.data, params['rows_to_duplicate'], params['percent'],
+                                     np.random.default_rng(params['seed']))
+        dataset = dataset.copy(new_data)
+    return dataset,
+
 
+def run(dataset_option: DatasetOption, params: dict):
+    dataset, = corrupt(dataset_option, params)
     check = DataDuplicates().add_condition_ratio_less_or_equal(0.1)
-    snippet = build_snippet(check, dataset_option, condition_name='add_condition_ratio_less_or_equal(0.1)')
-    put_data_on_state(dataset)
-    return check.run(dataset), snippet
+    snippets = build_snippets(check, dataset_option, condition_name='add_condition_ratio_less_or_equal(0.1)')
+    with time_stage('check'):
+        check_result = check.run(dataset)
+    return check_result, snippets
@@ -1,31 +1,52 @@
+from typing import Tuple
+
 import streamlit as st
 from deepchecks.tabular import Dataset
 from deepchecks.tabular.checks import FeatureLabelCorrelation
 
-from corruptions import relate_column_to_label
+from corruptions import relate_column_to_label, replace_column
 from datasets import DatasetOption
+from metrics import time_stage
 from streamlit_persist import persist
-from utils import build_snippet, put_data_on_state
+from utils import build_snippets
 
 
-def run(dataset_option: DatasetOption, check_param_col, manipulate_col):
+def get_params(dataset_option: DatasetOption, check_param_col, manipulate_col):
     dataset: Dataset = dataset_option.test
+    defaults = get_default_params(dataset_option)
 
     with check_param_col:
         st.text('No parameters to configure')
     with manipulate_col:
         st.subheader('Add Corruption to Train Data')
         # Allow manipulation only for numeric columns
-        column: str = st.selectbox('Select a column', dataset.numerical_features)
-        power = st.slider('Label correlation power', min_value=0., max_value=10., value=1., step=0.1, key=persist('single_feature_label_power'))
+        column: str = st.selectbox('Select a column', dataset.numerical_features,
+                                   index=dataset.numerical_features.index(defaults['column']))
+        power = st.slider('Label correlation power', min_value=0., max_value=10., value=defaults['power'], step=0.1, key=persist('single_feature_label_power'))
+    return dict(column=column, power=power)
+
+
+def get_default_params(dataset_option: DatasetOption) -> dict:
+    """Parameters of the check's first view, used by the warm-up. get_params starts its widgets from them."""
+    return dict(column=dataset_option.test.numerical_features[0], power=1.)
+
+
+@time_stage('corruption')
+def corrupt(dataset_option: DatasetOption, params: dict) -> Tuple[Dataset]:
+    """Datasets to run the check on, after the corruption is applied."""
+    dataset: Dataset = dataset_option.test
+    column, power = params['column'], params['power']
 
     if power > 0:
-        new_data = dataset.data.copy()
-        new_data[column] = relate_column_to_label(dataset, new_data[column], power)
-        dataset = dataset.copy(new_data)
+        dataset = replace_column(dataset, column, relate_column_to_label(dataset, dataset.data[column], power))
+    return dataset,
+
 
+def run(dataset_option: DatasetOption, params: dict):
+    dataset, = corrupt(dataset_option, params)
     check = FeatureLabelCorrelation().add_condition_feature_pps_less_than(0.2)
-    snippet = build_snippet(check, dataset_option,
-                            condition_name='add_condition_feature_pps_less_than(0.2)')
-    put_data_on_state(dataset)
-    return check.run(dataset), snippet
+    snippets = build_snippets(check, dataset_option,
+                              condition_name='add_condition_feature_pps_less_than(0.2)')
+    with time_stage('check'):
+        check_result = check.run(dataset)
+    return check_result, snippets
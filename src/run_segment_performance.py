@@ -1,22 +1,48 @@
+from typing import Tuple
+
 import streamlit as st
 
 from deepchecks.tabular import Dataset
 from deepchecks.tabular.checks import SegmentPerformance
 
 from datasets import DatasetOption
-from utils import build_snippet, put_data_on_state
+from metrics import time_stage
+from utils import build_snippets
 
 
-def run(dataset_option: DatasetOption, check_param_col, manipulate_col):
+def get_params(dataset_option: DatasetOption, check_param_col, manipulate_col):
     dataset: Dataset = dataset_option.test
+    defaults = get_default_params(dataset_option)
 
     with check_param_col:
-        column_1: str = st.selectbox('Select first column', dataset.features)
-        second_features = set(dataset.features) - {column_1}
-        column_2: str = st.selectbox('Select second column', second_features)
+        column_1: str = st.selectbox('Select first column', dataset.features,
+                                     index=dataset.features.index(defaults['column_1']))
+        # In the features' order, so the default second column is the same in every process
+        second_features = [feature for feature in dataset.features if feature != column_1]
+        # The default second column is kept while the first column is the default one
+        column_2_index = second_features.index(defaults['column_2']) if column_1 == defaults['column_1'] else 0
+        column_2: str = st.selectbox('Select second column', second_features, index=column_2_index)
+    return dict(column_1=column_1, column_2=column_2)
+
+
+def get_default_params(dataset_option: DatasetOption) -> dict:
+    """Parameters of the check's first view, used by the warm-up. get_params starts its widgets from them."""
+    features = dataset_option.test.features
+    return dict(column_1=features[0], column_2=next(feature for feature in features if feature != features[0]))
+
+
+@time_stage('corruption')
+def corrupt(dataset_option: DatasetOption, params: dict) -> Tuple[Dataset]:
+    """Datasets to run the check on. This check has no corruption."""
+    return dataset_option.test,
+
 
-    properties = dict(feature_1=column_1, feature_2=column_2, max_segments=3)
+def run(dataset_option: DatasetOption, params: dict):
+    dataset, = corrupt(dataset_option, params)
+    properties = dict(feature_1=params['column_1'], feature_2=params['column_2'], max_segments=3)
     check = SegmentPerformance(**properties)
-    snippet = build_snippet(check, dataset_option, properties=properties, model=True)
-    put_data_on_state(dataset)
-    return check.run(dataset, model=dataset_option.model, feature_importance=dataset_option.features_importance), snippet
+    snippets = build_snippets(check, dataset_option, properties=properties, model=True)
+    with time_stage('check'):
+        check_result = check.run(dataset, model=dataset_option.model,
+                                 feature_importance=dataset_option.features_importance)
+    return check_result, snippets
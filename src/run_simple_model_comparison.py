@@ -1,18 +1,44 @@
+from typing import Tuple
+
 import streamlit as st
+from deepchecks.tabular import Dataset
 from deepchecks.tabular.checks import SimpleModelComparison
 
 from datasets import DatasetOption
+from metrics import time_stage
 from streamlit_persist import persist
-from utils import build_snippet, put_data_on_state
+from utils import build_snippets
+
+
+MODEL_TYPES = ['tree', 'random', 'constant']
 
 
-def run(dataset_option: DatasetOption, check_param_col, manipulate_col):
+def get_params(dataset_option: DatasetOption, check_param_col, manipulate_col):
+    defaults = get_default_params(dataset_option)
     with check_param_col:
-        model_type = st.selectbox('Simple Model Type', ['tree', 'random', 'constant'], key=persist('simple_model_type'))
+        model_type = st.selectbox('Simple Model Type', MODEL_TYPES, index=MODEL_TYPES.index(defaults['model_type']),
+                                  key=persist('simple_model_type'))
+    return dict(model_type=model_type)
+
+
+def get_default_params(dataset_option: DatasetOption) -> dict:
+    """Parameters of the check's first view, used by the warm-up. get_params starts its widgets from them."""
+    return dict(model_type='tree')
+
+
+@time_stage('corruption')
+def corrupt(dataset_option: DatasetOption, params: dict) -> Tuple[Dataset, Dataset]:
+    """Datasets to run the check on. This check has no corruption."""
+    return dataset_option.train, dataset_option.test
+
+
+def run(dataset_option: DatasetOption, params: dict):
+    train_dataset, test_dataset = corrupt(dataset_option, params)
+    model_type = params['model_type']
     check = SimpleModelComparison(simple_model_type=model_type).add_condition_gain_greater_than(0.1)
-    snippet = build_snippet(check, dataset_option, properties={'simple_model_type': model_type}, model=True,
-                            condition_name='add_condition_gain_greater_than(0.1)')
-    put_data_on_state(dataset_option.train, dataset_option.test, dataset_type='test', corrupted_dataset_index=1)
-    return check.run(dataset_option.train, dataset_option.test, model=dataset_option.model,
-                     feature_importance=dataset_option.features_importance), \
-        snippet
+    snippets = build_snippets(check, dataset_option, properties={'simple_model_type': model_type}, model=True,
+                              condition_name='add_condition_gain_greater_than(0.1)')
+    with time_stage('check'):
+        check_result = check.run(train_dataset, test_dataset, model=dataset_option.model,
+                                 feature_importance=dataset_option.features_importance)
+    return check_result, snippets
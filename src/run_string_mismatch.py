@@ -1,33 +1,61 @@
+from typing import Tuple
+
+import numpy as np
 import streamlit as st
 from deepchecks.tabular import Dataset
 from deepchecks.tabular.checks import StringMismatch
 
-from corruptions import insert_variants
+from corruptions import insert_variants, replace_column
 from datasets import DatasetOption
+from metrics import time_stage
 from streamlit_persist import persist
-from utils import build_snippet, put_data_on_state
+from utils import build_snippets
 
 
-def run(dataset_option: DatasetOption, check_param_col, manipulate_col):
+def get_params(dataset_option: DatasetOption, check_param_col, manipulate_col):
     dataset: Dataset = dataset_option.train
-    new_data = dataset.data.copy()
+    defaults = get_default_params(dataset_option)
 
     if not dataset.cat_features:
         raise Exception('No categorical features in dataset, should not have reached here')
 
     with check_param_col:
         # Show column selector
-        column: str = st.selectbox('Select a column', dataset.cat_features)
+        column: str = st.selectbox('Select a column', dataset.cat_features,
+                                   index=dataset.cat_features.index(defaults['column']))
 
     with manipulate_col:
         st.subheader('Add Corruption to Data')
-        percent = st.slider('Variants Percent', value=10, min_value=0, max_value=100, step=1, key=persist('string_mismatch_percent'))
-        if percent > 0:
-            new_data[column] = insert_variants(new_data[column], percent)
+        values = st.multiselect('Values to corrupt (all if empty)', dataset.data[column].value_counts().index.tolist(),
+                                default=defaults['values'])
+        percent = st.slider('Variants Percent', value=defaults['percent'], min_value=0, max_value=100, step=1, key=persist('string_mismatch_percent'))
+    return dict(column=column, values=values, percent=percent)
+
+
+def get_default_params(dataset_option: DatasetOption) -> dict:
+    """Parameters of the check's first view, used by the warm-up. get_params starts its widgets from them."""
+    return dict(column=dataset_option.train.cat_features[0], values=[], percent=10)
+
+
+@time_stage('corruption')
+def corrupt(dataset_option: DatasetOption, params: dict) -> Tuple[Dataset]:
+    """Datasets to run the check on, after the corruption is applied."""
+    dataset: Dataset = dataset_option.train
+    column, percent = params['column'], params['percent']
+
+    if percent > 0:
+        dataset = replace_column(dataset, column, insert_variants(dataset.data[column], percent,
+                                                                  np.random.default_rng(params['seed']),
+                                                                  params['values'] or None))
+    return dataset,
+
 
+def run(dataset_option: DatasetOption, params: dict):
+    dataset, = corrupt(dataset_option, params)
+    column = params['column']
     check = StringMismatch(columns=[column]).add_condition_ratio_variants_less_or_equal(0.01)
-    snippet = build_snippet(check, dataset_option, condition_name='add_condition_ratio_variants_less_or_equal(0.01)',
-                            properties={'columns': [column]})
-    dataset = dataset.copy(new_data)
-    put_data_on_state(dataset)
-    return check.run(dataset), snippet
+    snippets = build_snippets(check, dataset_option, condition_name='add_condition_ratio_variants_less_or_equal(0.01)',
+                              properties={'columns': [column]})
+    with time_stage('check'):
+        check_result = check.run(dataset)
+    return check_result, snippets
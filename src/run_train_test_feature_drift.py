@@ -1,4 +1,4 @@
-import math
+from typing import Tuple
 
 import streamlit as st
 import numpy as np
@@ -7,49 +7,85 @@ from deepchecks.tabular import Dataset
 from deepchecks.tabular.checks import TrainTestFeatureDrift
 
 from datasets import DatasetOption
-from utils import build_snippet, std_without_outliers, put_data_on_state
-from corruptions import insert_numerical_drift, insert_categorical_drift
+from metrics import time_stage
+from utils import build_snippets, std_without_outliers, get_category_percent
+from corruptions import insert_numerical_drift, insert_categorical_drift, replace_column
 
 
-def run(dataset_option: DatasetOption, check_param_col, manipulate_col):
+def get_params(dataset_option: DatasetOption, check_param_col, manipulate_col):
     test_dataset: Dataset = dataset_option.test
-    new_data = test_dataset.data.copy()
+    data = test_dataset.data
     # Show column selector
     with check_param_col:
         columns = test_dataset.numerical_features + test_dataset.cat_features
         column: str = st.selectbox('Select a column', columns)
+    defaults = get_column_defaults(test_dataset, column)
 
     with manipulate_col:
         st.subheader('Add Corruption to Test Data')
         # Allow numeric drift
         if column in test_dataset.numerical_features:
-            col_std = std_without_outliers(new_data[column])
+            col_std = std_without_outliers(data[column])
             st.text('Add gaussian noise')
-            mean = st.slider('Mean', min_value=0.0, max_value=col_std * 5, step=col_std / 20, value=col_std / 2)
-            std = st.slider('Std', min_value=0.0, max_value=col_std * 5, step=col_std / 20, value=0.0)
-
-            if mean > 0 or std > 0:
-                new_data[column] = insert_numerical_drift(new_data[column], mean, std)
+            mean = st.slider('Mean', min_value=0.0, max_value=col_std * 5, step=col_std / 20, value=defaults['mean'])
+            std = st.slider('Std', min_value=0.0, max_value=col_std * 5, step=col_std / 20, value=defaults['std'])
+            return dict(column=column, mean=mean, std=std)
 
         # Allow categorical drift
         else:
-            category_to_drift = st.selectbox('Select a category to drift', test_dataset.data[column].unique())
+            categories = list(data[column].unique())
+            category_to_drift = st.selectbox('Select a category to drift', categories,
+                                             index=categories.index(defaults['category_to_drift']))
+            category_percent = get_category_percent(data[column], category_to_drift)
+            # The drifted category's current percent, so the data is unchanged until the slider is moved
+            percent_in_data = st.slider('Percent in test data', 0.0, 100.0, value=category_percent)
+            return dict(column=column, category_to_drift=category_to_drift, category_percent=category_percent,
+                        percent_in_data=percent_in_data)
 
-            # Calc current ratio
-            category_ratio = np.count_nonzero(new_data[column] == category_to_drift) / new_data[column].shape[0]
-            category_percent = math.floor(category_ratio * 10_000)/100.0
 
-            percent_in_data = st.slider('Percent in test data', 0.0, 100.0, value=category_percent)
-            if percent_in_data != category_percent:
-                new_data[column] = insert_categorical_drift(new_data[column], percent_in_data, category_to_drift)
+def get_column_defaults(test_dataset: Dataset, column: str) -> dict:
+    """Initial values of the widgets once the column is selected."""
+    values = test_dataset.data[column]
+    if column in test_dataset.numerical_features:
+        return dict(column=column, mean=std_without_outliers(values) / 2, std=0.0)
+    category_to_drift = values.unique()[0]
+    category_percent = get_category_percent(values, category_to_drift)
+    return dict(column=column, category_to_drift=category_to_drift, category_percent=category_percent,
+                percent_in_data=category_percent)
 
-    check_props = {'columns': [column], 'show_categories_by': 'largest_difference'}
-    check = TrainTestFeatureDrift(**check_props).add_condition_drift_score_less_than()
-    snippet = build_snippet(check, dataset_option, properties=check_props,
-                            condition_name='add_condition_drift_score_less_than(max_allowed_categorical_score = '
-                                           '0.2, max_allowed_numeric_score = 0.2)')
 
-    test_dataset = test_dataset.copy(new_data)
+def get_default_params(dataset_option: DatasetOption) -> dict:
+    """Parameters of the check's first view, used by the warm-up. get_params starts its widgets from them."""
+    test_dataset: Dataset = dataset_option.test
+    return get_column_defaults(test_dataset, (test_dataset.numerical_features + test_dataset.cat_features)[0])
+
 
-    put_data_on_state(dataset_option.train, test_dataset, dataset_type='test', corrupted_dataset_index=1)
-    return check.run(dataset_option.train, test_dataset), snippet
+@time_stage('corruption')
+def corrupt(dataset_option: DatasetOption, params: dict) -> Tuple[Dataset, Dataset]:
+    """Datasets to run the check on, after the corruption is applied."""
+    test_dataset: Dataset = dataset_option.test
+    column = params['column']
+    values = test_dataset.data[column]
+    rng = np.random.default_rng(params['seed'])
+
+    if column in test_dataset.numerical_features:
+        if params['mean'] > 0 or params['std'] > 0:
+            test_dataset = replace_column(test_dataset, column,
+                                          insert_numerical_drift(values, params['mean'], params['std'], rng))
+    elif params['percent_in_data'] != params['category_percent']:
+        test_dataset = replace_column(test_dataset, column,
+                                      insert_categorical_drift(values, params['percent_in_data'],
+                                                               params['category_to_drift'], rng))
+    return dataset_option.train, test_dataset
+
+
+def run(dataset_option: DatasetOption, params: dict):
+    train_dataset, test_dataset = corrupt(dataset_option, params)
+    check_props = {'columns': [params['column']], 'show_categories_by': 'largest_difference'}
+    check = TrainTestFeatureDrift(**check_props).add_condition_drift_score_less_than()
+    snippets = build_snippets(check, dataset_option, properties=check_props,
+                              condition_name='add_condition_drift_score_less_than(max_allowed_categorical_score = '
+                                             '0.2, max_allowed_numeric_score = 0.2)')
+    with time_stage('check'):
+        check_result = check.run(train_dataset, test_dataset)
+    return check_result, snippets
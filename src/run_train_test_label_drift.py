@@ -1,4 +1,4 @@
-import math
+from typing import Tuple
 
 import numpy as np
 import streamlit as st
@@ -6,14 +6,15 @@ from deepchecks.tabular import Dataset
 from deepchecks.tabular.checks import TrainTestLabelDrift
 
 from datasets import DatasetOption
-from utils import build_snippet, std_without_outliers, put_data_on_state
-from corruptions import insert_numerical_drift, insert_categorical_drift
+from metrics import time_stage
+from utils import build_snippets, std_without_outliers, get_category_percent
+from corruptions import insert_numerical_drift, insert_categorical_drift, replace_column
 
 
-def run(dataset_option: DatasetOption, check_param_col, manipulate_col):
+def get_params(dataset_option: DatasetOption, check_param_col, manipulate_col):
     test_dataset: Dataset = dataset_option.test
-    new_data = test_dataset.data.copy()
-    label_name = test_dataset.label_name
+    label = test_dataset.data[test_dataset.label_name]
+    defaults = get_default_params(dataset_option)
 
     with check_param_col:
         st.text('No parameters to control')
@@ -21,27 +22,62 @@ def run(dataset_option: DatasetOption, check_param_col, manipulate_col):
         st.subheader('Add Corruption to Test Data')
         # Allow numeric drift
         if test_dataset.label_type == 'regression_label':
-            col_std = std_without_outliers(new_data[label_name])
+            col_std = std_without_outliers(label)
             st.text('Add gaussian noise')
-            mean = st.slider('Mean', min_value=0.0, max_value=col_std * 5, step=col_std / 20, value=col_std / 2)
-            std = st.slider('Std', min_value=0.0, max_value=col_std * 5, step=col_std / 20, value=0.0)
-
-            if mean > 0 or std > 0:
-                new_data[label_name] = insert_numerical_drift(new_data[label_name], mean, std)
+            mean = st.slider('Mean', min_value=0.0, max_value=col_std * 5, step=col_std / 20, value=defaults['mean'])
+            std = st.slider('Std', min_value=0.0, max_value=col_std * 5, step=col_std / 20, value=defaults['std'])
+            return dict(mean=mean, std=std)
         elif test_dataset.label_type == 'classification_label':
-            category_to_drift = st.selectbox('Select a category to drift', new_data[label_name].unique())
+            categories = list(label.unique())
+            category_to_drift = st.selectbox('Select a category to drift', categories,
+                                             index=categories.index(defaults['category_to_drift']))
+            category_percent = get_category_percent(label, category_to_drift)
+            # The drifted category's current percent, so the data is unchanged until the slider is moved
+            percent_in_data = st.slider('Percent in test data', 0.0, 100.0, value=category_percent)
+            return dict(category_to_drift=category_to_drift, category_percent=category_percent,
+                        percent_in_data=percent_in_data)
+    return {}
 
-            # Calc current ratio
-            category_ratio = np.count_nonzero(new_data[label_name] == category_to_drift) / new_data[label_name].shape[0]
-            category_percent = math.floor(category_ratio * 10_000)/100.0
 
-            percent_in_data = st.slider('Percent in test data', 0.0, 100.0, value=category_percent)
-            if category_percent != percent_in_data:
-                new_data[label_name] = insert_categorical_drift(new_data[label_name], percent_in_data, category_to_drift)
+def get_default_params(dataset_option: DatasetOption) -> dict:
+    """Parameters of the check's first view, used by the warm-up. get_params starts its widgets from them."""
+    test_dataset: Dataset = dataset_option.test
+    label = test_dataset.data[test_dataset.label_name]
+    if test_dataset.label_type == 'regression_label':
+        return dict(mean=std_without_outliers(label) / 2, std=0.0)
+    elif test_dataset.label_type == 'classification_label':
+        category_to_drift = label.unique()[0]
+        category_percent = get_category_percent(label, category_to_drift)
+        return dict(category_to_drift=category_to_drift, category_percent=category_percent,
+                    percent_in_data=category_percent)
+    return {}
+
+
+@time_stage('corruption')
+def corrupt(dataset_option: DatasetOption, params: dict) -> Tuple[Dataset, Dataset]:
+    """Datasets to run the check on, after the corruption is applied."""
+    test_dataset: Dataset = dataset_option.test
+    label_name = test_dataset.label_name
+    label = test_dataset.data[label_name]
+    rng = np.random.default_rng(params['seed'])
+
+    if test_dataset.label_type == 'regression_label':
+        if params['mean'] > 0 or params['std'] > 0:
+            test_dataset = replace_column(test_dataset, label_name,
+                                          insert_numerical_drift(label, params['mean'], params['std'], rng))
+    elif test_dataset.label_type == 'classification_label':
+        if params['category_percent'] != params['percent_in_data']:
+            test_dataset = replace_column(test_dataset, label_name,
+                                          insert_categorical_drift(label, params['percent_in_data'],
+                                                                   params['category_to_drift'], rng))
+    return dataset_option.train, test_dataset
+
 
+def run(dataset_option: DatasetOption, params: dict):
+    train_dataset, test_dataset = corrupt(dataset_option, params)
     check = TrainTestLabelDrift().add_condition_drift_score_less_than()
-    snippet = build_snippet(check, dataset_option,
-                            condition_name='add_condition_drift_score_less_than(max_allowed_drift_score = 0.15)')
-    test_dataset = test_dataset.copy(new_data)
-    put_data_on_state(dataset_option.train, test_dataset, dataset_type='test', corrupted_dataset_index=1)
-    return check.run(dataset_option.train, test_dataset), snippet
+    snippets = build_snippets(check, dataset_option,
+                              condition_name='add_condition_drift_score_less_than(max_allowed_drift_score = 0.15)')
+    with time_stage('check'):
+        check_result = check.run(train_dataset, test_dataset)
+    return check_result, snippets
@@ -0,0 +1,34 @@
+"""
+Streamlit doesn't support custom HTTP endpoints, so this file adds handlers directly to the tornado application of
+the running streamlit server. When there is no server (e.g. running the script in bare mode) nothing is added and the
+callers are expected to fall back to their non-HTTP behaviour.
+"""
+import gc
+from typing import Optional, Type
+
+import tornado.web
+from streamlit import config
+from streamlit.web.server.server_util import make_url_path_regex
+
+__all__ = ['add_route', 'url_path']
+
+
+def get_tornado_app() -> Optional[tornado.web.Application]:
+    # Checking the type rather than isinstance, which fails on dead weak proxies
+    return next((obj for obj in gc.get_objects() if issubclass(type(obj), tornado.web.Application)), None)
+
+
+def url_path(*path) -> str:
+    """Absolute url of the given path, taking into account the configured base url path."""
+    path = [x.strip('/') for x in (config.get_option('server.baseUrlPath'),) + path if x]
+    return '/' + '/'.join(path)
+
+
+def add_route(path_regex: str, handler: Type[tornado.web.RequestHandler], handler_kwargs: dict = None) -> bool:
+    app = get_tornado_app()
+    if app is None:
+        return False
+    # Handlers added this way are matched before streamlit's own routes (including its catch-all static route)
+    pattern = make_url_path_regex(config.get_option('server.baseUrlPath'), path_regex)
+    app.add_handlers(r'.*', [(pattern, handler, handler_kwargs or {})])
+    return True
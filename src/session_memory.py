@@ -0,0 +1,191 @@
+"""
+Every session keeps its last check result in its state for as long as its browser tab is open (and for a while after
+it's closed), so the state of idle sessions adds up. A background thread periodically measures the state of all the
+sessions, and drops the heavy state which can be recomputed (the check run and the data recipe) of the sessions idle
+for a while, and of the least recently active ones while the total is over the budget.
+The widget values (see streamlit_persist.py) are kept, so on its next run an evicted session shows the same page again,
+with the result taken from the results cache or computed again.
+Results still held by the results cache are not charged to the sessions, evicting them from a session frees nothing.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, replace
+from typing import Dict, List, Tuple
+
+import streamlit as st
+import tornado.web
+from pympler.asizeof import Asizer
+from streamlit.logger import get_logger
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from constants import DATA_STATE_ID, RUN_STATE_ID, SESSION_IDLE_SECONDS, SESSION_STATE_MAX_BYTES, \
+    SESSION_SWEEP_SECONDS
+from server_routes import add_route
+
+__all__ = ['track_session', 'start_session_monitor', 'get_sessions_memory', 'SessionsMemory']
+
+# State rebuilt by the session's next run
+HEAVY_STATE_IDS = [RUN_STATE_ID, DATA_STATE_ID]
+SESSIONS_MEMORY_ENDPOINT = 'sessions-memory'
+
+_LOGGER = get_logger(__name__)
+
+
+@dataclass
+class SessionActivity:
+    last_active: float
+    running: bool = False
+
+
+@dataclass
+class SessionMemory:
+    total_bytes: int
+    heavy_bytes: int
+    idle_seconds: float
+
+
+@dataclass
+class SessionsMemory:
+    """Totals of the last sweep, and the evictions since the server started."""
+    sessions: int = 0
+    total_bytes: int = 0
+    heavy_bytes: int = 0
+    budget_bytes: int = SESSION_STATE_MAX_BYTES
+    evicted_sessions: int = 0
+    evicted_bytes: int = 0
+    # Largest sessions first
+    by_session: List[SessionMemory] = field(default_factory=list)
+
+
+# Keyed by session id. The lock is also held while evicting, so a session's script run can't start meanwhile
+_activity: Dict[str, SessionActivity] = {}
+_activity_lock = threading.Lock()
+_memory = SessionsMemory()
+_memory_lock = threading.Lock()
+
+
+@contextmanager
+def track_session():
+    """Mark the session as running for the duration of the script run, and as active when it's done."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        yield
+        return
+    with _activity_lock:
+        activity = _activity.setdefault(ctx.session_id, SessionActivity(time.monotonic()))
+        activity.running = True
+    try:
+        yield
+    finally:
+        with _activity_lock:
+            activity.running = False
+            activity.last_active = time.monotonic()
+
+
+def sizeof_owned(obj, shared: list) -> int:
+    """Size of the object, without the shared objects and what only they reference."""
+    asizer = Asizer()
+    asizer.exclude_objs(*shared)
+    return asizer.asizeof(obj)
+
+
+def measure_sessions() -> List[Tuple[str, object, SessionMemory]]:
+    """Measure the state of every session, including the disconnected ones streamlit still keeps."""
+    # Imported here, as the results cache imports the metrics, which import this file
+    from result_cache import result_cache
+
+    now = time.monotonic()
+    shared = result_cache.entries()
+    sessions = []
+    # The runtime has no public way to list the sessions, the same is done by streamlit's own session state stats
+    for session_info in Runtime.instance()._session_mgr.list_sessions():
+        session_id, state = session_info.session.id, session_info.session.session_state
+        try:
+            heavy_bytes = sum(sizeof_owned(state[key], shared) for key in HEAVY_STATE_IDS if key in state)
+            total_bytes = sizeof_owned(state, shared)
+        except (KeyError, RuntimeError):
+            # Changed by the session's script run while measured, it's measured again on the next sweep
+            continue
+        with _activity_lock:
+            activity = _activity.setdefault(session_id, SessionActivity(now))
+            idle_seconds = 0 if activity.running else now - activity.last_active
+        sessions.append((session_id, state, SessionMemory(total_bytes, heavy_bytes, idle_seconds)))
+    return sessions
+
+
+def evict_heavy_state(session_id: str, state) -> bool:
+    """Drop the heavy state of the session, unless its script is running. Returns whether it was dropped."""
+    with _activity_lock:
+        activity = _activity.get(session_id)
+        if activity is not None and activity.running:
+            return False
+        for key in HEAVY_STATE_IDS:
+            if key in state:
+                del state[key]
+    return True
+
+
+def sweep_sessions():
+    sessions = measure_sessions()
+    with _activity_lock:
+        # Forget the sessions streamlit already dropped
+        for session_id in set(_activity) - {session_id for session_id, _, _ in sessions}:
+            del _activity[session_id]
+
+    total_bytes = sum(memory.total_bytes for _, _, memory in sessions)
+    evicted_sessions = evicted_bytes = 0
+    # Idle sessions are evicted first, then the least recently active ones while over the budget
+    for session_id, state, memory in sorted(sessions, key=lambda s: s[2].idle_seconds, reverse=True):
+        if memory.idle_seconds < SESSION_IDLE_SECONDS and total_bytes <= SESSION_STATE_MAX_BYTES:
+            break
+        if memory.heavy_bytes > 0 and evict_heavy_state(session_id, state):
+            total_bytes -= memory.heavy_bytes
+            evicted_sessions += 1
+            evicted_bytes += memory.heavy_bytes
+            memory.total_bytes -= memory.heavy_bytes
+            memory.heavy_bytes = 0
+
+    with _memory_lock:
+        _memory.sessions = len(sessions)
+        _memory.total_bytes = total_bytes
+        _memory.heavy_bytes = sum(memory.heavy_bytes for _, _, memory in sessions)
+        _memory.evicted_sessions += evicted_sessions
+        _memory.evicted_bytes += evicted_bytes
+        _memory.by_session = sorted((memory for _, _, memory in sessions), key=lambda m: m.total_bytes, reverse=True)
+    _LOGGER.info('Sessions memory: %d sessions, %.2f MB (budget %.0f MB), evicted %d sessions (%.2f MB)',
+                 len(sessions), total_bytes / 1024 ** 2, SESSION_STATE_MAX_BYTES / 1024 ** 2, evicted_sessions,
+                 evicted_bytes / 1024 ** 2)
+
+
+def get_sessions_memory() -> SessionsMemory:
+    with _memory_lock:
+        return replace(_memory, by_session=list(_memory.by_session))
+
+
+class SessionsMemoryHandler(tornado.web.RequestHandler):
+    def get(self):
+        # Sessions are listed without their ids, which shouldn't be exposed to other users
+        self.set_header('Content-Type', 'application/json')
+        self.write(json.dumps(asdict(get_sessions_memory())))
+
+
+def _monitor_sessions():
+    while True:
+        time.sleep(SESSION_SWEEP_SECONDS)
+        try:
+            sweep_sessions()
+        except Exception:
+            _LOGGER.exception('Sessions memory sweep failed')
+
+
+@st.cache_resource(show_spinner=False)
+def start_session_monitor() -> bool:
+    """Start the sweeps once per process. Returns False if they are disabled or there is no server."""
+    if SESSION_SWEEP_SECONDS <= 0 or not Runtime.exists():
+        return False
+    add_route(SESSIONS_MEMORY_ENDPOINT, SessionsMemoryHandler)
+    threading.Thread(target=_monitor_sessions, name='session-monitor', daemon=True).start()
+    return True
@@ -0,0 +1,75 @@
+"""
+Deepchecks inlines its whole javascript bundle (plotly, require.js and the jupyter widgets manager, several MBs) into
+every check result html. This file moves the big inline scripts to urls served once per process, so every result
+iframe references the same assets and the browser downloads and caches them only once.
+"""
+import hashlib
+import re
+import threading
+from typing import Optional
+
+import tornado.web
+
+from server_routes import add_route, url_path
+
+__all__ = ['share_inline_scripts']
+
+ASSETS_ENDPOINT = 'assets'
+# Smaller scripts are specific to a result (e.g. widgets state), and are left inline
+MIN_SHARED_SCRIPT_BYTES = 10_000
+INLINE_SCRIPT = re.compile(r'<script type="text/javascript">(.*?)</script>', re.S)
+
+# The assets are content addressed, and there are only a few distinct ones per deepchecks version
+_assets = {}
+_assets_lock = threading.Lock()
+_route_added = None
+
+
+def register_asset(content: str) -> str:
+    """Register a script to be served and return its url."""
+    name = f'{hashlib.sha1(content.encode()).hexdigest()[:16]}.js'
+    with _assets_lock:
+        _assets.setdefault(name, content.encode())
+    return url_path(ASSETS_ENDPOINT, name)
+
+
+def get_asset(name: str) -> Optional[bytes]:
+    with _assets_lock:
+        return _assets.get(name)
+
+
+class AssetHandler(tornado.web.RequestHandler):
+    def get(self, name: str):
+        content = get_asset(name)
+        if content is None:
+            raise tornado.web.HTTPError(404)
+        self.set_header('Content-Type', 'text/javascript; charset=utf-8')
+        # The name is the hash of the content, so it can be cached forever
+        self.set_header('Cache-Control', 'public, max-age=31536000, immutable')
+        self.write(content)
+
+
+def ensure_assets_route() -> bool:
+    """Add the assets route to the server once per process. Returns False if there is no server to add it to.
+
+    Called from the threads running the checks, so streamlit's caching (which expects a script run) isn't used.
+    """
+    global _route_added
+    with _assets_lock:
+        if _route_added is None:
+            _route_added = add_route(f'{ASSETS_ENDPOINT}/(\\w+\\.js)', AssetHandler)
+        return _route_added
+
+
+def share_inline_scripts(html: str) -> str:
+    """Replace the big inline scripts of the html with references to the shared assets."""
+    if not ensure_assets_route():
+        return html
+
+    def replace(match: re.Match) -> str:
+        content = match.group(1)
+        if len(content) < MIN_SHARED_SCRIPT_BYTES:
+            return match.group(0)
+        return f'<script type="text/javascript" src="{register_asset(content)}"></script>'
+
+    return INLINE_SCRIPT.sub(replace, html)
@@ -61,6 +61,23 @@ def download_button(object_to_download, download_filename, button_text, pickle_i
     except AttributeError as e:
         b64 = base64.b64encode(object_to_download).decode()
 
+    return download_link(f'data:{mimetype};base64,{b64}', download_filename, button_text)
+
+
+def download_link(href, download_filename, button_text):
+    """
+    Generates a link styled as a button to download the file at the given href.
+
+    Params:
+    ------
+    href (str): url of the file to download.
+    download_filename (str): filename and extension of file. e.g. mydata.csv
+    button_text (str): Text to display on download button (e.g. 'click here to download file')
+
+    Returns:
+    -------
+    (str): the anchor tag to download the file
+    """
     button_uuid = str(uuid.uuid4()).replace('-', '')
     button_id = re.sub('\d+', '', button_uuid)
 
@@ -114,6 +131,6 @@ def download_button(object_to_download, download_filename, button_text, pickle_i
 
     dl_icon = '<img src="data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAABgAAAAYCAYAAADgdz34AAAABmJLR0QA/wD/AP+gvaeTAAAAbklEQVRIiWNgGEngKAMDw38oPkysJkYSLPhPjl4mEiwgC4xaMGoBbS0oZ0BkLPQ8wIAmV0+uA9AtwYbJNpwYSyg2HJ8lVDMcmyVEG85MggVHGSAF3EEGBoZGkpw2CvAB5EoDW2ai2GyaFxVDHwAAvJEmWknL71UAAAAASUVORK5CYII="/>'
     dl_link = custom_css + f'<a download="{download_filename}" class= "" id="{button_id}" ' \
-                           f'href="data:{mimetype};base64,{b64}">{dl_icon} {button_text}</a>'
+                           f'href="{href}">{dl_icon} {button_text}</a>'
 
     return dl_link
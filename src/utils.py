@@ -1,26 +1,36 @@
+import math
+import uuid
+from typing import TYPE_CHECKING
+
 import numpy as np
 import pandas as pd
 import streamlit as st
-from deepchecks import BaseCheck, TrainTestBaseCheck
 
-from constants import DATA_STATE_ID
+from constants import DATA_STATE_ID, SEED_QUERY_PARAM, DOWNLOAD_STATE_ID, BATCH_MODE_QUERY_PARAM
+from corrupted_data import DataRecipe, get_corrupted_data
 from datasets import DatasetOption
-from streamlit_dl_button import download_button
+from downloads import DATA_FORMATS, ensure_download_route, register_download, serialize_data
+from metrics import time_stage
+from streamlit_dl_button import download_button, download_link
+
+if TYPE_CHECKING:
+    from deepchecks import BaseCheck
 
 
-def build_run_params(is_train_test: bool, model: bool, dataset_opt: DatasetOption):
+def build_run_params(is_train_test: bool, model: bool, dataset_opt: DatasetOption, data_format: str = 'csv'):
     dataset_params = prepare_properties_string(dataset_opt.dataset_params)
+    read_function = DATA_FORMATS[data_format].read_function
 
     if is_train_test:
         run_arguments = 'train_dataset, test_dataset'
-        dataset_string = (f'path_to_train_data = "train.csv"\n'
-                          f'path_to_test_data = "test.csv"\n'
-                          f'train_dataset = Dataset(pd.read_csv(path_to_train_data), {dataset_params})\n'
-                          f'test_dataset = Dataset(pd.read_csv(path_to_test_data), {dataset_params})')
+        dataset_string = (f'path_to_train_data = "train.{data_format}"\n'
+                          f'path_to_test_data = "test.{data_format}"\n'
+                          f'train_dataset = Dataset(pd.{read_function}(path_to_train_data), {dataset_params})\n'
+                          f'test_dataset = Dataset(pd.{read_function}(path_to_test_data), {dataset_params})')
     else:
         run_arguments = 'dataset'
-        dataset_string = f'path_to_data = "data.csv"\n' \
-                         f'dataset = Dataset(pd.read_csv(path_to_data), {dataset_params})'
+        dataset_string = f'path_to_data = "data.{data_format}"\n' \
+                         f'dataset = Dataset(pd.{read_function}(path_to_data), {dataset_params})'
 
     if model:
         run_arguments += ', model=model'
@@ -31,32 +41,41 @@ def build_run_params(is_train_test: bool, model: bool, dataset_opt: DatasetOptio
     return run_arguments, dataset_string, model_load_string
 
 
-def build_snippet(check: BaseCheck,
-                  dataset_opt: DatasetOption,
-                  properties: dict = None,
-                  model: bool = False,
-                  condition_name: str = None):
+def build_snippets(check: 'BaseCheck',
+                   dataset_opt: DatasetOption,
+                   properties: dict = None,
+                   model: bool = False,
+                   condition_name: str = None):
+    """Build the check's snippet for each of the download data formats. Returns dict of data format to snippet."""
+    from deepchecks import TrainTestBaseCheck
+
     check_name = check.__class__.__name__
     is_train_test = isinstance(check, TrainTestBaseCheck)
-
-    run_arguments, dataset_string, model_load_string = build_run_params(is_train_test, model, dataset_opt)
     properties_string = prepare_properties_string(properties)
     condition_string = f'.{condition_name}' if condition_name else ''
-    snippet = ('import os; import sys; os.system(f"{sys.executable} -m pip install -U --quiet deepchecks")\n'
-               f'import pandas as pd\n'
-               f'from deepchecks.tabular.checks import {check_name}\n'
-               f'from deepchecks.tabular import Dataset\n'
-               f'{model_load_string}\n'
-               f'{dataset_string}\n\n'
-               f'check = {check_name}({properties_string}){condition_string}\n'
-               f'result = check.run({run_arguments})\n'
-               'result.show()')
 
-    return snippet
-
-
-def build_suite_snippet(suite_func, dataset_opt: DatasetOption, is_train_test: bool):
-    run_arguments, dataset_string, model_load_string = build_run_params(is_train_test, True, dataset_opt)
+    snippets = {}
+    for data_format in DATA_FORMATS:
+        run_arguments, dataset_string, model_load_string = build_run_params(is_train_test, model, dataset_opt,
+                                                                            data_format)
+        snippets[data_format] = (
+            'import os; import sys; os.system(f"{sys.executable} -m pip install -U --quiet deepchecks")\n'
+            f'import pandas as pd\n'
+            f'from deepchecks.tabular.checks import {check_name}\n'
+            f'from deepchecks.tabular import Dataset\n'
+            f'{model_load_string}\n'
+            f'{dataset_string}\n\n'
+            f'check = {check_name}({properties_string}){condition_string}\n'
+            f'result = check.run({run_arguments})\n'
+            'result.show()'
+        )
+
+    return snippets
+
+
+def build_suite_snippet(suite_func, dataset_opt: DatasetOption, is_train_test: bool, data_format: str = 'csv'):
+    run_arguments, dataset_string, model_load_string = build_run_params(is_train_test, True, dataset_opt,
+                                                                        data_format)
 
     snippet = ('import os; import sys; os.system(f"{sys.executable} -m pip install -U --quiet deepchecks")\n'
                f'import pandas as pd\n'
@@ -84,22 +103,41 @@ def prepare_properties_string(properties: dict):
     return ', '.join([f'{k}={quote_params(v)}' for k, v in properties.items()]) if properties else ''
 
 
-def put_data_on_state(*datasets, dataset_type=None, corrupted_dataset_index=0):
-    dataset_type = dataset_type + ' dataset' if dataset_type else 'dataset'
-    data_frames = [d.data for d in datasets]
-    st.session_state[DATA_STATE_ID] = {'data': data_frames, 'dataset_type': dataset_type,
-                                       'corrupted_dataset_index': corrupted_dataset_index}
+def put_data_on_state(data_recipe: DataRecipe):
+    # Only the recipe is kept per session, the data itself is rebuilt when needed
+    st.session_state[DATA_STATE_ID] = data_recipe
 
 
-def add_download_button():
+def add_download_button(data_format: str = 'csv'):
     if DATA_STATE_ID not in st.session_state:
         return
-    data_frames = st.session_state[DATA_STATE_ID]['data']
+    data_recipe = st.session_state[DATA_STATE_ID]
+    data_frames = get_corrupted_data(data_recipe)
+    labels = dict(check=data_recipe['check_name'], dataset=data_recipe['dataset_name'])
     if len(data_frames) == 1:
-        download_md = download_button(data_frames[0], 'data.csv', 'Download Data')
+        files = [(f'data.{data_format}', 'Download Data')]
+    else:
+        files = [(f'train.{data_format}', 'Download Train Data'), (f'test.{data_format}', 'Download Test Data')]
+
+    if ensure_download_route():
+        # The data is serialized only when the link is clicked, streamed by the download route
+        if DOWNLOAD_STATE_ID not in st.session_state:
+            st.session_state[DOWNLOAD_STATE_ID] = uuid.uuid4().hex
+        download_key = st.session_state[DOWNLOAD_STATE_ID]
+        # The registered download holds the recipe and not the data, which is rebuilt if it was evicted meanwhile
+        download_md = ''.join(
+            download_link(register_download(download_key, filename,
+                                            lambda index=index: get_corrupted_data(data_recipe)[index],
+                                            labels),
+                          filename, button_text)
+            for index, (filename, button_text) in enumerate(files)
+        )
     else:
-        download_md = download_button(data_frames[0], 'train.csv', 'Download Train Data')
-        download_md += download_button(data_frames[1], 'test.csv', 'Download Test Data')
+        mimetype = DATA_FORMATS[data_format].mimetype
+        with time_stage('download', **labels):
+            download_md = ''.join(download_button(serialize_data(df, data_format), filename, button_text,
+                                                  mimetype=mimetype)
+                                  for df, (filename, button_text) in zip(data_frames, files))
     st.markdown(download_md + '<br>', unsafe_allow_html=True)
 
 
@@ -111,8 +149,21 @@ def get_query_param(param_name: str):
     return None
 
 
+def get_seed_query_param():
+    seed = get_query_param(SEED_QUERY_PARAM)
+    return int(seed) if seed is not None and seed.isdigit() else None
+
+
+def get_batch_mode_query_param():
+    batch_mode = get_query_param(BATCH_MODE_QUERY_PARAM)
+    return batch_mode.lower() in ('1', 'true') if batch_mode is not None else None
+
+
 def set_query_param(param_name: str, state_id):
-    st.experimental_set_query_params(**{param_name: st.session_state[state_id]})
+    # Keep the other query params (e.g. seed) in place
+    query_params = st.experimental_get_query_params()
+    query_params[param_name] = st.session_state[state_id]
+    st.experimental_set_query_params(**query_params)
 
 
 # @contextmanager
@@ -135,6 +186,12 @@ def set_query_param(param_name: str, state_id):
 #         placeholder.empty()
 
 
+def get_category_percent(data: pd.Series, category) -> float:
+    """Percent of the category in the data, rounded down to 2 decimal places."""
+    category_ratio = np.count_nonzero(data == category) / data.shape[0]
+    return math.floor(category_ratio * 10_000) / 100.0
+
+
 def std_without_outliers(data, outlier_threshold=0.025):
     data = data.to_numpy() if isinstance(data, pd.Series) else data
     trim = int(outlier_threshold * data.size)
@@ -0,0 +1,88 @@
+"""
+Most visitors look at a check with its default parameters, so right after the server starts the default result of
+every check on every dataset is computed in the background and put in the results cache.
+Streamlit has no server startup hook, so the warm-up starts with the first script run of the process.
+"""
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from functools import partial
+
+import streamlit as st
+
+from check_docs import get_check_docs
+from check_runner import compute_result, run_shared
+from checks import CheckOption, get_check_datasets, get_check_options_by_name, load_run_module
+from constants import DEFAULT_SEED, WARMUP_WORKERS
+from datasets import DatasetOption, get_dataset_options
+from metrics import stage_labels
+from result_cache import build_cache_key, result_cache
+
+__all__ = ['start_warmup', 'get_warmup_progress', 'WarmupProgress']
+
+
+@dataclass
+class WarmupProgress:
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.done + self.failed == self.total
+
+
+_progress = WarmupProgress()
+_progress_lock = threading.Lock()
+
+
+def warm_up(check_name: str, check_opt: CheckOption, dataset_name: str, dataset: DatasetOption):
+    run_module = load_run_module(check_opt)
+    with stage_labels(check=check_name, dataset=dataset_name):
+        params = run_module.get_default_params(dataset)
+    params['seed'] = DEFAULT_SEED
+    cache_key = build_cache_key(check_name, dataset_name, params)
+    if cache_key not in result_cache:
+        run_shared(cache_key, partial(compute_result, check_name, run_module, dataset_name, dataset, params))
+
+
+def _count_warmup(future, name: str):
+    with _progress_lock:
+        if future.exception() is None:
+            _progress.done += 1
+        else:
+            _progress.failed += 1
+            print(f'Warm-up of {name} failed:\n' +
+                  ''.join(traceback.format_exception(future.exception())))
+        if _progress.finished:
+            print(f'Warm-up finished: {_progress.done} results computed, {_progress.failed} failed')
+
+
+@st.cache_resource(show_spinner=False)
+def start_warmup() -> bool:
+    """Start the warm-up once per process. Returns False if it's disabled."""
+    if WARMUP_WORKERS <= 0:
+        return False
+    datasets = get_dataset_options()
+    tasks = [(check_name, check_opt, dataset_name, dataset)
+             for check_name, check_opt in get_check_options_by_name().items()
+             for dataset_name, dataset in get_check_datasets(check_name, datasets).items()]
+    with _progress_lock:
+        _progress.total = len(tasks)
+
+    executor = ThreadPoolExecutor(max_workers=WARMUP_WORKERS, thread_name_prefix='warmup')
+    # The checks' docs are shown on every page of their check, so they are rendered first
+    for check_opt in get_check_options_by_name().values():
+        executor.submit(get_check_docs, check_opt['class_path'])
+    for task in tasks:
+        future = executor.submit(warm_up, *task)
+        future.add_done_callback(partial(_count_warmup, name=f'{task[0]} on {task[2]}'))
+    # Nothing else is submitted, the threads exit once all the tasks are done
+    executor.shutdown(wait=False)
+    return True
+
+
+def get_warmup_progress() -> WarmupProgress:
+    with _progress_lock:
+        return replace(_progress)
@@ -0,0 +1,63 @@
+"""
+Runs the checks in worker processes, so concurrent runs use all the cores instead of competing for the GIL.
+Every worker builds its own dataset options once and keeps the loaded datasets resident between runs. Only the run
+parameters are sent to a worker, and only the rendered result is sent back.
+"""
+import importlib
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from constants import CHECK_RUN_PROCESSES
+from datasets import DatasetOption, build_dataset_options
+from metrics import capture_stages, get_stage_labels, record_stages, stage_labels, time_stage
+
+__all__ = ['create_pool', 'render_html', 'run_check', 'run_in_worker']
+
+# Datasets of the worker process, set by the pool initializer
+_worker_datasets: Optional[Dict[str, DatasetOption]] = None
+
+
+def _init_worker():
+    global _worker_datasets
+    _worker_datasets = build_dataset_options()
+
+
+@time_stage('html')
+def render_html(check_result) -> str:
+    string_io = io.StringIO()
+    check_result.save_as_html(string_io)
+    return string_io.getvalue()
+
+
+def run_check(module_path: str, dataset_name: str, params: dict) -> Tuple[str, Any, Dict[str, str]]:
+    """Run the check in the worker process and return its html, value and snippets."""
+    run_module = importlib.import_module(module_path)
+    check_result, snippets = run_module.run(_worker_datasets[dataset_name], params)
+    return render_html(check_result), check_result.value, snippets
+
+
+def _run_check_captured(module_path: str, dataset_name: str, params: dict, labels: dict):
+    """run_check, also returning the stages it timed, which aren't recorded in the worker process."""
+    with capture_stages() as stages, stage_labels(**labels):
+        result = run_check(module_path, dataset_name, params)
+    return result, stages
+
+
+def create_pool(processes: int) -> ProcessPoolExecutor:
+    # Spawned rather than forked, as the server process has running threads (tornado, streamlit, the check runs)
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker)
+
+
+_pool = create_pool(CHECK_RUN_PROCESSES) if CHECK_RUN_PROCESSES > 0 else None
+
+
+def run_in_worker(module_path: str, dataset_name: str, params: dict) -> Tuple[str, Any, Dict[str, str]]:
+    """Run the check in a worker process and return its html, value and snippets."""
+    # The worker's stages are labeled like the ones of the calling thread
+    result, stages = _pool.submit(_run_check_captured, module_path, dataset_name, params,
+                                  get_stage_labels()).result()
+    record_stages(stages)
+    return result
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The app's modules are flat in src, and are imported by their names
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
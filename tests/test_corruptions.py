@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from corruptions import insert_categorical_drift
+
+ROWS = 1000
+CATEGORIES = ['a', 'b', 'c', 'd']
+
+
+def make_column(category_percent: int) -> pd.Series:
+    # The drifted category 'a' takes category_percent of the rows, the other categories share the rest
+    rows_of_category = ROWS * category_percent // 100
+    other_values = np.resize(CATEGORIES[1:], ROWS - rows_of_category)
+    values = np.concatenate([np.full(rows_of_category, 'a', dtype=object), other_values.astype(object)])
+    return pd.Series(values, index=np.arange(ROWS) * 3 + 7, name='letter')
+
+
+def category_ratio(values, category: str = 'a') -> float:
+    return np.count_nonzero(np.asarray(values) == category) / len(values)
+
+
+@pytest.mark.parametrize('initial_percent', [0, 30, 90])
+@pytest.mark.parametrize('percent', [0, 10, 55, 100])
+@pytest.mark.parametrize('dtype', ['object', 'category'])
+def test_series_ratio_matches_percent(initial_percent, percent, dtype):
+    column = make_column(initial_percent).astype(dtype)
+    if dtype == 'category':
+        column = column.cat.set_categories(CATEGORIES)
+    drifted = insert_categorical_drift(column, percent, 'a', np.random.default_rng(0))
+
+    assert category_ratio(drifted) == percent / 100
+    assert drifted.dtype == column.dtype
+    assert drifted.index.equals(column.index)
+    assert drifted.name == column.name
+
+
+@pytest.mark.parametrize('initial_percent', [0, 30, 90])
+@pytest.mark.parametrize('percent', [0, 10, 55, 100])
+def test_ndarray_ratio_matches_percent(initial_percent, percent):
+    values = make_column(initial_percent).to_numpy()
+    drifted = insert_categorical_drift(values, percent, 'a', np.random.default_rng(0))
+
+    assert isinstance(drifted, np.ndarray)
+    assert category_ratio(drifted) == percent / 100
+
+
+@pytest.mark.parametrize('dtype', ['object', 'category'])
+def test_decrease_moves_rows_to_other_categories(dtype):
+    column = make_column(80).astype(dtype)
+    drifted = insert_categorical_drift(column, 20, 'a', np.random.default_rng(0))
+
+    # Only rows of the category are replaced, and only with the categories already in the data
+    changed = np.asarray(drifted != column)
+    assert np.count_nonzero(changed) == 600
+    assert set(column[changed]) == {'a'}
+    assert set(drifted[changed]) <= set(CATEGORIES[1:])
+
+
+@pytest.mark.parametrize('dtype', ['object', 'category'])
+def test_increase_replaces_only_other_categories(dtype):
+    column = make_column(20).astype(dtype)
+    drifted = insert_categorical_drift(column, 70, 'a', np.random.default_rng(0))
+
+    changed = np.asarray(drifted != column)
+    assert np.count_nonzero(changed) == 500
+    assert 'a' not in set(column[changed])
+    assert set(drifted[changed]) == {'a'}
+
+
+def test_input_is_not_modified():
+    column = make_column(30)
+    original = column.copy()
+    insert_categorical_drift(column, 60, 'a', np.random.default_rng(0))
+    values = column.to_numpy()
+    insert_categorical_drift(values, 60, 'a', np.random.default_rng(0))
+
+    assert column.equals(original)
+    assert np.array_equal(values, original.to_numpy())
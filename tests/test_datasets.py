@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from deepchecks.tabular import Dataset
+
+from datasets import compact_dtypes
+
+
+def make_dataset() -> Dataset:
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        'precise': rng.random(100) * 10_000,
+        'half': np.arange(100) / 2,
+        'with_nan': np.where(np.arange(100) % 10 == 0, np.nan, np.arange(100) * 0.25),
+        'count': np.arange(100, dtype='int64'),
+        'color': np.resize(['red', 'green', 'blue'], 100),
+        'label': rng.integers(0, 2, 100),
+    })
+    return Dataset(data, label='label', cat_features=['color'])
+
+
+def test_compact_dtypes_keeps_the_values():
+    dataset = make_dataset()
+    compacted = compact_dtypes(dataset)
+
+    for column in dataset.data.columns:
+        assert np.array_equal(compacted.data[column].astype(dataset.data[column].dtype).to_numpy(),
+                              dataset.data[column].to_numpy(), equal_nan=dataset.data[column].dtype.kind == 'f')
+
+
+def test_compact_dtypes_downcasts_only_exact_floats():
+    compacted = compact_dtypes(make_dataset()).data
+
+    assert compacted['precise'].dtype == 'float64'
+    assert compacted['half'].dtype == 'float32'
+    assert compacted['with_nan'].dtype == 'float32'
+    assert compacted['count'].dtype == 'int8'
+    assert isinstance(compacted['color'].dtype, pd.CategoricalDtype)
+    assert compacted['label'].dtype == 'int64'
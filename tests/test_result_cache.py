@@ -0,0 +1,30 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from result_cache import ResultCache, deep_sizeof, estimate_size
+
+
+def make_result(value) -> dict:
+    return dict(html='<div></div>', value=value, snippets={'csv': 'snippet'}, data_recipe={'params': {'seed': 0}})
+
+
+def test_deep_sizeof_counts_the_contents():
+    frame = pd.DataFrame({'number': np.arange(10_000.), 'text': ['value'] * 10_000})
+    value = {'frame': frame, 'values': list(range(1000)), 'array': np.zeros(1000)}
+
+    frame_bytes = int(frame.memory_usage(deep=True).sum())
+    assert deep_sizeof(value) > frame_bytes + 8000 + sys.getsizeof(list(range(1000)))
+    # The same frame referenced twice is counted once
+    assert deep_sizeof(dict(value, again=frame)) < deep_sizeof(value) + frame_bytes
+
+
+def test_cache_evicts_by_the_values_size():
+    values = [pd.DataFrame({'number': np.arange(10_000.)}) for _ in range(3)]
+    cache = ResultCache('test', max_entries=10, max_bytes=2 * estimate_size(make_result(values[0])))
+    for index, value in enumerate(values):
+        cache.put(str(index), make_result(value))
+
+    assert '0' not in cache
+    assert '1' in cache and '2' in cache